@@ -1,16 +1,36 @@
 # app.py - Main Flask Application for Intelligent Excuse Generator
 import os
 import json
+import asyncio
+import atexit
+import base64
+import contextlib
+import cProfile
+import csv
+import glob
+import hashlib
+import hmac
+import io
+import pstats
+import queue
 import random
+import re
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+import click
+from collections import OrderedDict
+from types import SimpleNamespace
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, render_template, session, send_file
+from flask import Flask, Response, g, request, jsonify, render_template, session, send_file, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-import openai
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from PIL import Image, ImageDraw, ImageFont
-import requests
-from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import event, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Engine
 from decouple import config
 
 # Initialize Flask app
@@ -19,26 +39,675 @@ app.config['SECRET_KEY'] = config('SECRET_KEY', default='dev-secret-key-change-i
 app.config['SQLALCHEMY_DATABASE_URI'] = config('DATABASE_URL', default='sqlite:///excuse_generator.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# SQLite connection tuning
+app.config['SQLITE_WAL'] = config('SQLITE_WAL', default=True, cast=bool)
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = config('SQLITE_BUSY_TIMEOUT_MS', default=5000, cast=int)
+app.config['SQLITE_SYNCHRONOUS'] = config('SQLITE_SYNCHRONOUS', default='NORMAL')
+
+# Per-process metrics snapshots, merged by /metrics
+app.config['METRICS_DIR'] = config('METRICS_DIR', default=os.path.join(app.instance_path, 'metrics'))
+app.config['METRICS_FLUSH_SECONDS'] = config('METRICS_FLUSH_SECONDS', default=1.0, cast=float)
+
+# Write-behind persistence for new excuses
+app.config['WRITE_BEHIND_ENABLED'] = config('WRITE_BEHIND_ENABLED', default=False, cast=bool)
+app.config['WRITE_BEHIND_BATCH_SIZE'] = config('WRITE_BEHIND_BATCH_SIZE', default=200, cast=int)
+app.config['WRITE_BEHIND_FLUSH_MS'] = config('WRITE_BEHIND_FLUSH_MS', default=200, cast=int)
+app.config['WRITE_BEHIND_ID_BLOCK'] = config('WRITE_BEHIND_ID_BLOCK', default=100, cast=int)
+# Rows that cannot be committed are appended here as NDJSON instead of being lost
+app.config['WRITE_BEHIND_DEAD_LETTER_PATH'] = config(
+    'WRITE_BEHIND_DEAD_LETTER_PATH', default=os.path.join(app.instance_path, 'write_behind_failed.ndjson')
+)
+
+# Usage, rating and favorite changes, collected in memory and written in batches
+app.config['USAGE_FLUSH_SECONDS'] = config('USAGE_FLUSH_SECONDS', default=1.0, cast=float)
+app.config['USAGE_MAX_PENDING'] = config('USAGE_MAX_PENDING', default=500, cast=int)
+
+@event.listens_for(Engine, 'connect')
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers proceed while a worker holds the write lock, and
+    # synchronous=NORMAL only fsyncs at checkpoints instead of every commit
+    if app.config['SQLITE_WAL']:
+        cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute(f"PRAGMA synchronous={app.config['SQLITE_SYNCHRONOUS']}")
+    cursor.execute(f"PRAGMA busy_timeout={int(app.config['SQLITE_BUSY_TIMEOUT_MS'])}")
+    cursor.close()
+
 # Initialize extensions
 db = SQLAlchemy(app)
 
 # Configure APIs
-openai.api_key = config('OPENAI_API_KEY', default='')
+app.config['OPENAI_API_KEY'] = config('OPENAI_API_KEY', default='')
+app.config['OPENAI_API_BASE'] = config('OPENAI_API_BASE', default='')
+
+# LLM latency budget and circuit breaker settings
+app.config['LLM_TIMEOUT_SECONDS'] = config('LLM_TIMEOUT_SECONDS', default=6.0, cast=float)
+app.config['LLM_MAX_WORKERS'] = config('LLM_MAX_WORKERS', default=8, cast=int)
+app.config['LLM_BREAKER_THRESHOLD'] = config('LLM_BREAKER_THRESHOLD', default=5, cast=int)
+app.config['LLM_BREAKER_COOLDOWN'] = config('LLM_BREAKER_COOLDOWN', default=30.0, cast=float)
+# Async mode: OpenAI calls run on one event loop per worker instead of a thread each
+app.config['ASYNC_MODE'] = config('ASYNC_MODE', default=False, cast=bool)
+app.config['ASYNC_MAX_CONNECTIONS'] = config('ASYNC_MAX_CONNECTIONS', default=256, cast=int)
+# In-flight OpenAI calls per worker; past this, requests get a fallback excuse instead of queueing.
+# Defaults to the thread pool size so every admitted call starts right away
+app.config['LLM_MAX_IN_FLIGHT'] = config(
+    'LLM_MAX_IN_FLIGHT', default=256 if app.config['ASYNC_MODE'] else app.config['LLM_MAX_WORKERS'], cast=int
+)
+
+# Request coalescing: 0 disables the batching window
+app.config['LLM_BATCH_WINDOW_MS'] = config('LLM_BATCH_WINDOW_MS', default=0, cast=int)
+app.config['LLM_BATCH_MAX_SIZE'] = config('LLM_BATCH_MAX_SIZE', default=8, cast=int)
+
+# Bulk generation limits
+app.config['BULK_MAX_ITEMS'] = config('BULK_MAX_ITEMS', default=100, cast=int)
+app.config['BULK_MAX_WORKERS'] = config('BULK_MAX_WORKERS', default=4, cast=int)
+app.config['EXPORT_CHUNK_SIZE'] = config('EXPORT_CHUNK_SIZE', default=500, cast=int)
+
+# Generated excuse cache settings
+app.config['EXCUSE_CACHE_ENABLED'] = config('EXCUSE_CACHE_ENABLED', default=True, cast=bool)
+app.config['EXCUSE_CACHE_MAX_ENTRIES'] = config('EXCUSE_CACHE_MAX_ENTRIES', default=1024, cast=int)
+app.config['EXCUSE_CACHE_TTL_SECONDS'] = config('EXCUSE_CACHE_TTL_SECONDS', default=3600, cast=int)
+app.config['EXCUSE_CACHE_VARIANTS'] = config('EXCUSE_CACHE_VARIANTS', default=3, cast=int)
+app.config['EXCUSE_CACHE_PATH'] = config('EXCUSE_CACHE_PATH', default=os.path.join(app.instance_path, 'excuse_cache.db'))
+
+# Fallback excuse corpus: excuses.json compiled into a shared SQLite file
+app.config['CORPUS_SOURCE'] = config('CORPUS_SOURCE', default=os.path.join(app.root_path, 'excuses.json'))
+app.config['CORPUS_PATH'] = config('CORPUS_PATH', default=os.path.join(app.instance_path, 'excuse_corpus.db'))
+app.config['CORPUS_RELOAD_SECONDS'] = config('CORPUS_RELOAD_SECONDS', default=5.0, cast=float)
+
+# Pre-generated excuse pools for popular (category, urgency, language) keys
+app.config['POOL_ENABLED'] = config('POOL_ENABLED', default=True, cast=bool)
+app.config['POOL_PATH'] = config('POOL_PATH', default=os.path.join(app.instance_path, 'excuse_pool.db'))
+app.config['POOL_SCOPE'] = config('POOL_SCOPE', default='generic')
+app.config['POOL_MAX_SIZE'] = config('POOL_MAX_SIZE', default=50, cast=int)
+app.config['POOL_LOW_WATER'] = config('POOL_LOW_WATER', default=0.5, cast=float)
+app.config['POOL_LEAD_MINUTES'] = config('POOL_LEAD_MINUTES', default=10.0, cast=float)
+app.config['POOL_BATCH_SIZE'] = config('POOL_BATCH_SIZE', default=5, cast=int)
+app.config['POOL_REFILL_SECONDS'] = config('POOL_REFILL_SECONDS', default=15, cast=int)
+app.config['POOL_MAX_AGE_HOURS'] = config('POOL_MAX_AGE_HOURS', default=24.0, cast=float)
+
+# Believability scoring; JSON object overriding BelievabilityScorer.DEFAULT_WEIGHTS
+app.config['SCORING_WEIGHTS'] = config('SCORING_WEIGHTS', default='{}', cast=json.loads)
+app.config['RESCORE_CHUNK_SIZE'] = config('RESCORE_CHUNK_SIZE', default=2000, cast=int)
+
+# Text-to-speech synthesis and audio cache
+app.config['TTS_BACKEND'] = config('TTS_BACKEND', default='gtts')
+app.config['TTS_CACHE_DIR'] = config('TTS_CACHE_DIR', default=os.path.join(app.static_folder, 'audio', 'cache'))
+app.config['TTS_CACHE_MAX_MB'] = config('TTS_CACHE_MAX_MB', default=200, cast=int)
+app.config['TTS_MAX_WORKERS'] = config('TTS_MAX_WORKERS', default=4, cast=int)
+app.config['TTS_TIMEOUT_SECONDS'] = config('TTS_TIMEOUT_SECONDS', default=30.0, cast=float)
+app.config['TTS_MAX_IN_FLIGHT'] = config('TTS_MAX_IN_FLIGHT', default=8, cast=int)
+app.config['TTS_STUB_DELAY_MS'] = config('TTS_STUB_DELAY_MS', default=0, cast=int)
+
+# Proof documents are rendered with PIL/reportlab on a pool of this many threads
+app.config['PROOF_MAX_WORKERS'] = config('PROOF_MAX_WORKERS', default=2, cast=int)
+
+# Token-bucket rate limits for generation and voice requests, shared by all workers
+app.config['RATE_LIMIT_ENABLED'] = config('RATE_LIMIT_ENABLED', default=True, cast=bool)
+app.config['RATE_LIMIT_PATH'] = config('RATE_LIMIT_PATH', default=os.path.join(app.instance_path, 'rate_limits.db'))
+app.config['RATE_LIMIT_USER_PER_MINUTE'] = config('RATE_LIMIT_USER_PER_MINUTE', default=30.0, cast=float)
+app.config['RATE_LIMIT_USER_BURST'] = config('RATE_LIMIT_USER_BURST', default=10.0, cast=float)
+app.config['RATE_LIMIT_GLOBAL_PER_MINUTE'] = config('RATE_LIMIT_GLOBAL_PER_MINUTE', default=600.0, cast=float)
+app.config['RATE_LIMIT_GLOBAL_BURST'] = config('RATE_LIMIT_GLOBAL_BURST', default=100.0, cast=float)
+
+# Background maintenance: artifact retention and SQLite upkeep
+app.config['MAINTENANCE_ENABLED'] = config('MAINTENANCE_ENABLED', default=True, cast=bool)
+app.config['MAINTENANCE_INTERVAL_MINUTES'] = config('MAINTENANCE_INTERVAL_MINUTES', default=15, cast=int)
+app.config['AUDIO_RETENTION_DAYS'] = config('AUDIO_RETENTION_DAYS', default=7.0, cast=float)
+app.config['AUDIO_MAX_MB'] = config('AUDIO_MAX_MB', default=500, cast=int)
+app.config['PROOF_RETENTION_DAYS'] = config('PROOF_RETENTION_DAYS', default=30.0, cast=float)
+app.config['PROOF_MAX_MB'] = config('PROOF_MAX_MB', default=500, cast=int)
+app.config['DB_MAINTENANCE_HOUR'] = config('DB_MAINTENANCE_HOUR', default=4, cast=int)
+app.config['DB_VACUUM_MIN_FREE_RATIO'] = config('DB_VACUUM_MIN_FREE_RATIO', default=0.2, cast=float)
+
+# Request profiling: a sample of requests, plus any request with a signed X-Profile-Token
+app.config['PROFILING_ENABLED'] = config('PROFILING_ENABLED', default=False, cast=bool)
+app.config['PROFILING_SAMPLE_RATE'] = config('PROFILING_SAMPLE_RATE', default=0.01, cast=float)
+app.config['PROFILING_MODE'] = config('PROFILING_MODE', default='cprofile')
+app.config['PROFILING_SAMPLER_INTERVAL_MS'] = config('PROFILING_SAMPLER_INTERVAL_MS', default=5.0, cast=float)
+app.config['PROFILING_DIR'] = config('PROFILING_DIR', default=os.path.join(app.instance_path, 'profiles'))
+app.config['PROFILING_MAX_FILES'] = config('PROFILING_MAX_FILES', default=200, cast=int)
+app.config['PROFILING_SECRET'] = config('PROFILING_SECRET', default='')
+
+# Metrics: counters and latency histograms, exported in Prometheus format
+class Metrics:
+    """Process-local counters and histograms, shared with other workers via files.
+
+    Each worker periodically writes its totals to <directory>/<pid>.json. The
+    /metrics endpoint sums every file, so a scrape sees the whole gunicorn
+    pool whichever worker answers it. Files from exited workers are kept, so
+    totals never go backwards; gunicorn.conf.py clears the directory when
+    the master starts.
+    """
+
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    DESCRIPTIONS = {
+        'http_requests_total': ('counter', 'HTTP requests by endpoint, method and status'),
+        'http_request_duration_seconds': ('histogram', 'Time to produce a response, by endpoint'),
+        'excuse_stage_duration_seconds': ('histogram', 'Time spent in each stage of serving a request'),
+        'excuses_served_total': ('counter', 'Excuses served, by path (llm, cache, fallback)'),
+        'llm_fallbacks_total': ('counter', 'Requests that fell back from the LLM, by reason'),
+        'llm_tokens_total': ('counter', 'OpenAI tokens used, by kind'),
+        'db_query_duration_seconds': ('histogram', 'SQL statement time, by operation'),
+        'tts_requests_total': ('counter', 'Voice requests by audio cache result'),
+        'rate_limited_total': ('counter', 'Requests rejected with 429, by scope and limit'),
+        'maintenance_runs_total': ('counter', 'Maintenance job runs, by job and result'),
+        'maintenance_files_removed_total': ('counter', 'Generated files deleted by retention and size quotas'),
+        'profiles_written_total': ('counter', 'Request profiles written, by mode'),
+    }
+
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._next_flush = 0.0
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.LATENCY_BUCKETS), 0.0, 0]
+            for i, bound in enumerate(self.LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram[0][i] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+
+    @contextlib.contextmanager
+    def timer(self, name='excuse_stage_duration_seconds', **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def _snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, dict(labels), list(h[0]), h[1], h[2]] for (name, labels), h in self._histograms.items()]
+            }
+
+    def flush(self, force=False):
+        """Write this worker's totals where /metrics can read them"""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now < self._next_flush:
+            return
+        self._next_flush = now + self.flush_interval
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(self._snapshot(), f)
+        os.replace(f"{path}.tmp", path)
+
+    def collect(self):
+        """Totals summed over every worker's snapshot"""
+        snapshots = []
+        if self.directory:
+            self.flush(force=True)
+            for path in glob.glob(os.path.join(self.directory, '*.json')):
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        else:
+            snapshots.append(self._snapshot())
+        
+        counters, histograms = {}, {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                key = self._key(name, labels)
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, buckets, total, count in snapshot['histograms']:
+                key = self._key(name, labels)
+                merged = histograms.setdefault(key, [[0] * len(self.LATENCY_BUCKETS), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+                merged[1] += total
+                merged[2] += count
+        return counters, histograms
+
+    def render(self):
+        counters, histograms = self.collect()
+        lines = []
+        
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+            return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+        
+        for name in sorted({key[0] for key in counters} | {key[0] for key in histograms}):
+            kind, help_text = self.DESCRIPTIONS.get(name, ('counter' if any(k[0] == name for k in counters) else 'histogram', name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{label_text(labels)} {value}")
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(self.LATENCY_BUCKETS, buckets):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{label_text(labels, [('le', str(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{label_text(labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{label_text(labels)} {total}")
+                lines.append(f"{name}_count{label_text(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics(app.config['METRICS_DIR'], flush_interval=app.config['METRICS_FLUSH_SECONDS'])
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, so a statement that raises leaves nothing behind
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_start', None)
+    if started is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else 'other'
+    if operation not in ('select', 'insert', 'update', 'delete'):
+        operation = 'other'
+    metrics.observe('db_query_duration_seconds', time.perf_counter() - started, operation=operation)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started,
+                        endpoint=endpoint, method=request.method)
+        metrics.inc('http_requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+    metrics.flush()
+    return response
+
+# Request profiling
+def collapse_stack(frame):
+    """A frame and its callers as one collapsed-stack line, outermost first"""
+    names = []
+    while frame is not None:
+        names.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class StackSampler:
+    """Wall-clock profiler: records the stack of each registered thread every `interval` seconds.
+
+    One background thread per process samples every profiled request, and
+    only while there is one. Unlike cProfile it adds no per-call overhead,
+    and time spent waiting on sockets or locks shows up where it happens.
+    """
+    
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread = None
+        self._pid = None
+    
+    def start(self, thread_id):
+        with self._lock:
+            # Started on first use so forked gunicorn workers each get their own
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._sessions = {}
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+            self._sessions[thread_id] = {}
+            self._active.set()
+    
+    def stop(self, thread_id):
+        """Sample counts per collapsed stack for the thread, which is no longer sampled"""
+        with self._lock:
+            stacks = self._sessions.pop(thread_id, {})
+            if not self._sessions:
+                self._active.clear()
+        return stacks
+    
+    def _run(self):
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, stacks in self._sessions.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stack = collapse_stack(frame)
+                        stacks[stack] = stacks.get(stack, 0) + 1
+
+class RequestProfiler:
+    """Profiles a sample of requests and keeps the results in a bounded directory.
+
+    A request is profiled when profiling is enabled and it falls in the
+    `sample_rate` fraction, or when it carries an X-Profile-Token signed
+    with `secret` for its path. Mode 'cprofile' writes a .pstats file and
+    'sampler' a collapsed-stack .txt file for flame graph tools. Each
+    profile gets a .json summary (route, status, duration, hottest
+    functions) that the admin endpoints read. All workers share the
+    directory, and only the newest `max_files` profiles are kept.
+    """
+    MODES = ('cprofile', 'sampler')
+    
+    def __init__(self, directory, enabled=False, sample_rate=0.01, mode='cprofile', secret='', max_files=200, sampler_interval=0.005):
+        self.directory = directory
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.mode = mode if mode in self.MODES else 'cprofile'
+        self.secret = secret
+        self.max_files = max(1, max_files)
+        self.sampler = StackSampler(sampler_interval)
+        self.stats = {'profiled': 0, 'written': 0, 'errors': 0}
+    
+    def sign(self, scope, path='', ttl=3600):
+        """A token for X-Profile-Token (scope 'profile') or X-Admin-Token (scope 'admin')"""
+        expires = int(time.time() + ttl)
+        return f"{expires}.{self._signature(scope, path, expires)}"
+    
+    def verify(self, token, scope, path=''):
+        if not self.secret or not token:
+            return False
+        expires, _, signature = token.partition('.')
+        if not expires.isdigit() or int(expires) < time.time():
+            return False
+        return hmac.compare_digest(signature, self._signature(scope, path, int(expires)))
+    
+    def _signature(self, scope, path, expires):
+        return hmac.new(self.secret.encode(), f"{scope}:{path}:{expires}".encode(), hashlib.sha256).hexdigest()
+    
+    def should_profile(self, path, token=None):
+        if token and self.verify(token, 'profile', path):
+            return True
+        return self.enabled and random.random() < self.sample_rate
+    
+    def start(self, mode=None):
+        mode = mode if mode in self.MODES else self.mode
+        if mode == 'sampler':
+            self.sampler.start(threading.get_ident())
+            return mode, None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            return None
+        return mode, profile
+    
+    def discard(self, session):
+        mode, profile = session
+        if mode == 'sampler':
+            return self.sampler.stop(threading.get_ident())
+        profile.disable()
+        return profile
+    
+    def finish(self, session, route, method, path, status, duration):
+        """Stop profiling this request and write it out; returns the profile's name"""
+        mode = session[0]
+        result = self.discard(session)
+        self.stats['profiled'] += 1
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{os.getpid()}-{slug}"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if mode == 'sampler':
+                data_file = name + '.txt'
+                with open(os.path.join(self.directory, data_file), 'w') as f:
+                    f.writelines(f"{stack} {count}\n" for stack, count in sorted(result.items()))
+                hot = self._hot_stacks(result)
+            else:
+                data_file = name + '.pstats'
+                result.dump_stats(os.path.join(self.directory, data_file))
+                hot = self._hot_functions(result)
+            summary = {
+                'name': name, 'route': route, 'method': method, 'path': path, 'status': status,
+                'duration_ms': round(duration * 1000, 2), 'mode': mode, 'file': data_file,
+                'pid': os.getpid(), 'created_at': datetime.utcnow().isoformat(), 'hot': hot
+            }
+            # Written last and renamed into place, so readers only see complete profiles
+            temp_path = os.path.join(self.directory, f".{name}.json.tmp")
+            with open(temp_path, 'w') as f:
+                json.dump(summary, f)
+            os.replace(temp_path, os.path.join(self.directory, name + '.json'))
+            self.stats['written'] += 1
+            metrics.inc('profiles_written_total', mode=mode)
+            self._prune()
+        except OSError as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ Could not write profile {name}: {e}")
+            return None
+        return name
+    
+    @staticmethod
+    def _hot_functions(profile, limit=5):
+        entries = sorted(pstats.Stats(profile).stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        return [
+            {'function': f"{os.path.basename(filename)}:{function}", 'ms': round(own_time * 1000, 3)}
+            for (filename, _, function), (_, _, own_time, _, _) in entries
+        ]
+    
+    def _hot_stacks(self, stacks, limit=5):
+        # Time where each function was on top of the stack, which is where the thread was
+        leaves = {}
+        for stack, count in stacks.items():
+            leaf = stack.rsplit(';', 1)[-1]
+            leaves[leaf] = leaves.get(leaf, 0) + count
+        top = sorted(leaves.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [{'function': leaf, 'ms': round(count * self.sampler.interval * 1000, 3)} for leaf, count in top]
+    
+    def _prune(self):
+        # Names start with a timestamp, so sorting them puts the oldest first
+        summaries = sorted(glob.glob(os.path.join(self.directory, '*.json')))
+        for summary_path in summaries[:max(0, len(summaries) - self.max_files)]:
+            name = os.path.basename(summary_path)[:-len('.json')]
+            for path in [summary_path] + glob.glob(os.path.join(self.directory, glob.escape(name) + '.*')):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+    
+    def summaries(self):
+        for summary_path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(summary_path) as f:
+                    yield json.load(f)
+            except (OSError, ValueError):
+                # Pruned by another worker meanwhile
+                continue
+    
+    def slowest(self, limit=5, route=None):
+        """The `limit` slowest profiled requests of each route, slowest first"""
+        by_route = {}
+        for summary in self.summaries():
+            if route is None or summary['route'] == route:
+                by_route.setdefault(summary['route'], []).append(summary)
+        return {
+            name: sorted(entries, key=lambda summary: summary['duration_ms'], reverse=True)[:limit]
+            for name, entries in sorted(by_route.items())
+        }
+    
+    def profile_path(self, name):
+        """Path of a profile's data file, or None for an unknown or malformed name"""
+        if not re.fullmatch(r'\d{8}T\d{12}-\d+-\w+', name):
+            return None
+        for extension in ('.pstats', '.txt'):
+            path = os.path.join(self.directory, name + extension)
+            if os.path.exists(path):
+                return path
+        return None
+    
+    def snapshot(self):
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'mode': self.mode,
+            'token_requests': bool(self.secret),
+            'max_files': self.max_files,
+            **self.stats
+        }
+
+profiler = RequestProfiler(
+    app.config['PROFILING_DIR'],
+    enabled=app.config['PROFILING_ENABLED'],
+    sample_rate=app.config['PROFILING_SAMPLE_RATE'],
+    mode=app.config['PROFILING_MODE'],
+    secret=app.config['PROFILING_SECRET'],
+    max_files=app.config['PROFILING_MAX_FILES'],
+    sampler_interval=app.config['PROFILING_SAMPLER_INTERVAL_MS'] / 1000.0
+)
+
+@app.before_request
+def start_request_profile():
+    if request.path.startswith('/api/admin/'):
+        return
+    if profiler.should_profile(request.path, request.headers.get('X-Profile-Token')):
+        session = profiler.start(request.headers.get('X-Profile-Mode'))
+        if session:
+            g.profile = session
+            g.profile_started = time.perf_counter()
+
+@app.after_request
+def finish_request_profile(response):
+    # Streamed bodies are produced after this point, so their profiles cover the view only
+    session = g.pop('profile', None)
+    if session:
+        name = profiler.finish(
+            session,
+            route=request.url_rule.rule if request.url_rule else 'unmatched',
+            method=request.method,
+            path=request.path,
+            status=response.status_code,
+            duration=time.perf_counter() - g.pop('profile_started')
+        )
+        if name:
+            response.headers['X-Profile-Id'] = name
+    return response
+
+@app.teardown_request
+def discard_request_profile(error=None):
+    # Requests that never reached after_request must not leave a profiler running
+    session = g.pop('profile', None)
+    if session:
+        profiler.discard(session)
+
+# Optional subsystems, imported on first use
+class FeatureUnavailable(Exception):
+    pass
+
+class FeatureRegistry:
+    """Loads heavy optional dependencies the first time they are needed.
+
+    Importing the app stays cheap, so gunicorn workers boot fast. With
+    preload_app, the master can call `preload()` before forking so workers
+    share the loaded modules.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._loaded = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def register(self, name):
+        def decorator(loader):
+            self._loaders[name] = loader
+            return loader
+        return decorator
+
+    def get(self, name):
+        if name in self._loaded:
+            return self._loaded[name]
+        with self._lock:
+            if name not in self._loaded and name not in self._errors:
+                try:
+                    started = time.perf_counter()
+                    self._loaded[name] = self._loaders[name]()
+                    print(f"✅ Loaded {name} in {(time.perf_counter() - started) * 1000:.0f}ms")
+                except Exception as e:
+                    print(f"⚠️ {name} unavailable: {e}")
+                    self._errors[name] = str(e)
+            if name in self._errors:
+                raise FeatureUnavailable(f"{name} unavailable: {self._errors[name]}")
+            return self._loaded[name]
+
+    def available(self, name):
+        try:
+            self.get(name)
+            return True
+        except FeatureUnavailable:
+            return False
+
+    def preload(self, names=None):
+        for name in names or list(self._loaders):
+            self.available(name)
+
+    def snapshot(self):
+        return {
+            name: 'loaded' if name in self._loaded else ('unavailable' if name in self._errors else 'not_loaded')
+            for name in self._loaders
+        }
+
+features = FeatureRegistry()
+
+@features.register('openai')
+def load_openai():
+    import openai
+    openai.api_key = app.config['OPENAI_API_KEY']
+    if app.config['OPENAI_API_BASE']:
+        openai.api_base = app.config['OPENAI_API_BASE']
+    return openai
 
-# Initialize text-to-speech (Google TTS - no PyAudio needed!)
-try:
+@features.register('aiohttp')
+def load_aiohttp():
+    import aiohttp
+    return aiohttp
+
+@features.register('scheduler')
+def load_scheduler():
+    from apscheduler.schedulers.background import BackgroundScheduler
+    return BackgroundScheduler
+
+@features.register('tts')
+def load_tts():
+    # Google TTS - no PyAudio needed!
     from gtts import gTTS
-    import pygame
-    pygame.mixer.init()
-    print("✅ Google Text-to-Speech initialized successfully!")
-    tts_available = True
-except ImportError:
-    print("⚠️ gTTS not installed. Voice features will be disabled.")
-    print("💡 To enable voice: pip install gTTS pygame")
-    tts_available = False
-except Exception as e:
-    print(f"⚠️ TTS initialization error: {e}")
-    tts_available = False
+    return gTTS
+
+@features.register('pdf')
+def load_pdf():
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+    return SimpleNamespace(canvas=canvas, letter=letter)
+
+@features.register('imaging')
+def load_imaging():
+    from PIL import Image, ImageDraw, ImageFont
+    return SimpleNamespace(Image=Image, ImageDraw=ImageDraw, ImageFont=ImageFont)
 
 # Database Models
 class User(db.Model):
@@ -63,9 +732,18 @@ class Excuse(db.Model):
     proof_generated = db.Column(db.Boolean, default=False)
     times_used = db.Column(db.Integer, default=0)
     effectiveness_rating = db.Column(db.Float, default=0.0)
+    # Number of ratings averaged into effectiveness_rating
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     is_favorite = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_used = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        # Serves history pages; SQLite appends the rowid, so this also covers (created_at, id) order
+        db.Index('ix_excuse_user_created', 'user_id', 'created_at'),
+        # Most-used excuses per user for /api/stats
+        db.Index('ix_excuse_user_times_used', 'user_id', 'times_used'),
+    )
 
 class ProofDocument(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -74,9 +752,1621 @@ class ProofDocument(db.Model):
     file_path = db.Column(db.String(200), nullable=False)
     generated_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class ExcuseStats(db.Model):
+    """Per-user totals, kept current by the session hooks below.
+
+    One row per (user, dimension, value): dimension 'all' (value '*') holds
+    the user's overall totals, and 'category', 'urgency' and 'language' rows
+    break them down. `version` grows on every change and backs the ETag of
+    /api/stats.
+    """
+    user_id = db.Column(db.Integer, primary_key=True)
+    dimension = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(50), primary_key=True)
+    excuse_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    favorite_count = db.Column(db.Integer, nullable=False, default=0)
+    times_used_sum = db.Column(db.Integer, nullable=False, default=0)
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+class MaintenanceLease(db.Model):
+    """Which process may run a maintenance job, and the outcome of its last run"""
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    last_run_at = db.Column(db.DateTime)
+    last_result = db.Column(db.Text)
+
+class IdSequence(db.Model):
+    """Next free primary key per table, for inserts that assign ids up front"""
+    name = db.Column(db.String(50), primary_key=True)
+    next_id = db.Column(db.Integer, nullable=False)
+
+def reserve_excuse_ids(count, connection=None):
+    """Reserve `count` consecutive Excuse ids in the current transaction.
+
+    The UPDATE takes SQLite's write lock, so no other worker can insert
+    excuses until the caller commits. Rows with known ids are sent as one
+    executemany INSERT, because SQLAlchemy doesn't have to read ids back.
+    """
+    connection = connection or db.session
+    connection.execute(db.text("INSERT OR IGNORE INTO id_sequence (name, next_id) VALUES ('excuse', 1)"))
+    next_id = connection.execute(db.text(
+        "UPDATE id_sequence SET next_id = max(next_id, (SELECT coalesce(max(id), 0) + 1 FROM excuse)) + :count "
+        "WHERE name = 'excuse' RETURNING next_id"
+    ), {'count': count}).scalar()
+    return range(next_id - count, next_id)
+
+# Full-text search over excuse_text and scenario. The FTS5 table stores no
+# text of its own; it indexes a view over excuse, and triggers keep it in
+# step with writes. The view adds an `owner` token ('u<user_id>') so a
+# search only walks the user's own matches instead of every user's
+SEARCH_INDEX_DDL = [
+    "CREATE VIEW IF NOT EXISTS excuse_search_source AS "
+    "SELECT id, excuse_text, scenario, 'u' || user_id AS owner FROM excuse",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS excuse_fts USING fts5("
+    "excuse_text, scenario, owner, content='excuse_search_source', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS excuse_fts_insert AFTER INSERT ON excuse BEGIN "
+    "INSERT INTO excuse_fts (rowid, excuse_text, scenario, owner) "
+    "VALUES (new.id, new.excuse_text, new.scenario, 'u' || new.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS excuse_fts_delete AFTER DELETE ON excuse BEGIN "
+    "INSERT INTO excuse_fts (excuse_fts, rowid, excuse_text, scenario, owner) "
+    "VALUES ('delete', old.id, old.excuse_text, old.scenario, 'u' || old.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS excuse_fts_update AFTER UPDATE OF excuse_text, scenario, user_id ON excuse BEGIN "
+    "INSERT INTO excuse_fts (excuse_fts, rowid, excuse_text, scenario, owner) "
+    "VALUES ('delete', old.id, old.excuse_text, old.scenario, 'u' || old.user_id); "
+    "INSERT INTO excuse_fts (rowid, excuse_text, scenario, owner) "
+    "VALUES (new.id, new.excuse_text, new.scenario, 'u' || new.user_id); END",
+]
+
+def create_search_index():
+    """Create the FTS5 index and its triggers, filling it from existing rows if new"""
+    if db.engine.url.get_backend_name() != 'sqlite':
+        return False
+    try:
+        with db.engine.begin() as connection:
+            exists = connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'excuse_fts'"
+            ).first() is not None
+            for statement in SEARCH_INDEX_DDL:
+                connection.exec_driver_sql(statement)
+            if not exists:
+                connection.exec_driver_sql("INSERT INTO excuse_fts (excuse_fts) VALUES ('rebuild')")
+    except Exception as e:
+        # SQLite builds without FTS5 fall back to LIKE queries
+        print(f"⚠️ Full-text search index unavailable: {e}")
+        return False
+    return True
+
+def migrate_database():
+    """Create missing tables and indexes on new and existing databases"""
+    inspector = db.inspect(db.engine)
+    new_stats_table = not inspector.has_table(ExcuseStats.__tablename__)
+    # create_all() does not add columns to tables that already exist
+    if inspector.has_table(Excuse.__tablename__):
+        columns = {column['name'] for column in inspector.get_columns(Excuse.__tablename__)}
+        if 'rating_count' not in columns:
+            with db.engine.begin() as connection:
+                connection.execute(db.text('ALTER TABLE excuse ADD COLUMN rating_count INTEGER NOT NULL DEFAULT 0'))
+    db.create_all()
+    # create_all() skips indexes on tables that already exist
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+    if new_stats_table:
+        # Existing excuses predate the rollup hooks
+        rebuild_excuse_stats()
+    create_search_index()
+
+@app.cli.command('migrate-db')
+def migrate_db_command():
+    """Bring the database schema up to date"""
+    migrate_database()
+    print("📊 Database schema is up to date")
+
+@app.cli.command('compile-corpus')
+def compile_corpus_command():
+    """Recompile the fallback excuse corpus from its source file"""
+    excuse_generator.corpus.compile()
+
+# Per-user statistics rollups
+STATS_DIMENSIONS = (('category', 'category'), ('urgency', 'urgency_level'), ('language', 'language'))
+
+def excuse_stat_values(excuse, previous=False):
+    """The fields ExcuseStats tracks, as they are now or as they were before this flush"""
+    state = db.inspect(excuse)
+    values = {}
+    for name in ('user_id', 'category', 'urgency_level', 'language', 'believability_score', 'is_favorite', 'times_used'):
+        history = state.attrs[name].history
+        if previous and history.deleted:
+            values[name] = history.deleted[0]
+        else:
+            values[name] = getattr(excuse, name)
+    return values
+
+def add_stats_delta(deltas, values, sign):
+    if values['user_id'] is None:
+        return
+    change = (
+        sign,
+        sign * (values['believability_score'] or 0.0),
+        sign * (1 if values['is_favorite'] else 0),
+        sign * (values['times_used'] or 0),
+    )
+    keys = [('all', '*')] + [(dimension, values[field] or '') for dimension, field in STATS_DIMENSIONS]
+    for dimension, value in keys:
+        total = deltas.setdefault((values['user_id'], dimension, value), [0, 0.0, 0, 0])
+        for index, amount in enumerate(change):
+            total[index] += amount
+
+@event.listens_for(db.session, 'before_flush')
+def update_excuse_stats(session, flush_context, instances):
+    deltas = {}
+    for excuse in session.new:
+        if isinstance(excuse, Excuse):
+            add_stats_delta(deltas, excuse_stat_values(excuse), 1)
+    for excuse in session.dirty:
+        if isinstance(excuse, Excuse) and session.is_modified(excuse, include_collections=False):
+            add_stats_delta(deltas, excuse_stat_values(excuse, previous=True), -1)
+            add_stats_delta(deltas, excuse_stat_values(excuse), 1)
+            # Any change can reorder most-used excuses, so always bump the version
+            deltas.setdefault((excuse_stat_values(excuse)['user_id'], 'all', '*'), [0, 0.0, 0, 0])
+    for excuse in session.deleted:
+        if isinstance(excuse, Excuse):
+            add_stats_delta(deltas, excuse_stat_values(excuse, previous=True), -1)
+    # Same transaction as the excuse rows, one executemany for the whole flush
+    apply_stats_deltas(session.connection(), deltas)
+
+def apply_stats_deltas(connection, deltas):
+    """Add summed deltas from add_stats_delta to the excuse_stats rows"""
+    if not deltas:
+        return
+    connection.execute(db.text(
+        "INSERT INTO excuse_stats (user_id, dimension, value, excuse_count, score_sum, favorite_count, times_used_sum, version) "
+        "VALUES (:user_id, :dimension, :value, :excuse_count, :score_sum, :favorite_count, :times_used_sum, 1) "
+        "ON CONFLICT (user_id, dimension, value) DO UPDATE SET "
+        "excuse_count = excuse_count + excluded.excuse_count, "
+        "score_sum = score_sum + excluded.score_sum, "
+        "favorite_count = favorite_count + excluded.favorite_count, "
+        "times_used_sum = times_used_sum + excluded.times_used_sum, "
+        "version = version + 1"
+    ), [
+        {
+            'user_id': user_id, 'dimension': dimension, 'value': value,
+            'excuse_count': change[0], 'score_sum': change[1],
+            'favorite_count': change[2], 'times_used_sum': change[3]
+        }
+        for (user_id, dimension, value), change in deltas.items()
+    ])
+
+def rebuild_excuse_stats():
+    """Recompute every rollup row from the excuse table.
+
+    Rows are overwritten in place and their versions bumped, so ETags handed
+    out before the rebuild never match afterwards.
+    """
+    selects = ["SELECT user_id, 'all' AS dimension, '*' AS value, {aggregates} FROM excuse GROUP BY user_id"]
+    for dimension, field in STATS_DIMENSIONS:
+        selects.append(
+            f"SELECT user_id, '{dimension}', coalesce({field}, ''), {{aggregates}} FROM excuse GROUP BY user_id, coalesce({field}, '')"
+        )
+    aggregates = ("count(*), coalesce(sum(believability_score), 0.0), "
+                  "coalesce(sum(is_favorite), 0), coalesce(sum(times_used), 0)")
+    with db.engine.begin() as connection:
+        connection.execute(db.text("CREATE TEMP TABLE fresh_stats AS " + " UNION ALL ".join(selects).format(aggregates=aggregates)))
+        try:
+            connection.execute(db.text(
+                "INSERT INTO excuse_stats (user_id, dimension, value, excuse_count, score_sum, favorite_count, times_used_sum, version) "
+                "SELECT *, 1 FROM fresh_stats WHERE true "
+                "ON CONFLICT (user_id, dimension, value) DO UPDATE SET "
+                "excuse_count = excluded.excuse_count, score_sum = excluded.score_sum, "
+                "favorite_count = excluded.favorite_count, times_used_sum = excluded.times_used_sum, "
+                "version = version + 1"
+            ))
+            # Users with no excuses left keep a zeroed 'all' row so their version keeps growing
+            connection.execute(db.text(
+                "UPDATE excuse_stats SET excuse_count = 0, score_sum = 0.0, favorite_count = 0, times_used_sum = 0, version = version + 1 "
+                "WHERE dimension = 'all' AND user_id NOT IN (SELECT user_id FROM fresh_stats)"
+            ))
+            deleted = connection.execute(db.text(
+                "DELETE FROM excuse_stats WHERE dimension != 'all' AND (user_id, dimension, value) NOT IN "
+                "(SELECT user_id, dimension, value FROM fresh_stats)"
+            )).rowcount
+            rows = connection.execute(db.text("SELECT count(*) FROM fresh_stats")).scalar()
+        finally:
+            connection.execute(db.text("DROP TABLE fresh_stats"))
+    return rows, deleted
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the per-user statistics rollups from the excuse table"""
+    started = time.perf_counter()
+    rows, deleted = rebuild_excuse_stats()
+    print(f"📊 Rebuilt {rows} statistics rows ({deleted} stale rows removed) in {time.perf_counter() - started:.1f}s")
+
+# Write-behind persistence for new excuses
+class ExcuseWriter:
+    """Hands new Excuse rows to a background thread that commits them in batches.
+
+    Ids are reserved from id_sequence in blocks, so `submit` can return an id
+    right away. The writer commits whenever `batch_size` rows are waiting or
+    `flush_interval` seconds have passed. `flush()` blocks until everything
+    submitted so far is committed. If a batch keeps failing, its rows are
+    committed one at a time, and rows that still fail are appended to
+    `dead_letter_path` so they can be replayed.
+    """
+
+    def __init__(self, app, batch_size=200, flush_interval=0.2, id_block=100, dead_letter_path=None):
+        self.app = app
+        self.dead_letter_path = dead_letter_path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.id_block = max(1, id_block)
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._ids = iter(())
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.stats = {'submitted': 0, 'written': 0, 'batches': 0, 'errors': 0, 'dropped': 0}
+
+    def submit(self, **fields):
+        return self.submit_many([fields])[0]
+
+    def submit_many(self, rows):
+        ids = []
+        with self._lock:
+            self._ensure_thread()
+            for fields in rows:
+                excuse_id = self._next_id()
+                fields = dict(fields, id=excuse_id)
+                fields.setdefault('created_at', datetime.utcnow())
+                self._pending.add(excuse_id)
+                self._queue.put(fields)
+                ids.append(excuse_id)
+            self.stats['submitted'] += len(rows)
+        return ids
+
+    def is_pending(self, excuse_id):
+        with self._lock:
+            return excuse_id in self._pending
+
+    def issued(self, excuse_id):
+        """Whether any worker may have handed out `excuse_id` (it is below id_sequence's high-water mark)"""
+        next_id = db.session.execute(db.text("SELECT next_id FROM id_sequence WHERE name = 'excuse'")).scalar()
+        return next_id is not None and excuse_id < next_id
+
+    def flush(self, timeout=10.0):
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _next_id(self):
+        # Caller holds self._lock
+        excuse_id = next(self._ids, None)
+        if excuse_id is None:
+            with self.app.app_context():
+                with db.engine.begin() as connection:
+                    self._ids = iter(reserve_excuse_ids(self.id_block, connection))
+            excuse_id = next(self._ids)
+        return excuse_id
+
+    def _ensure_thread(self):
+        # Started on first use so forked gunicorn workers each get their own
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pending = set()
+                self._ids = iter(())
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='excuse-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _write(self, batch):
+        failed = []
+        if self._commit(batch):
+            written = len(batch)
+        else:
+            # One bad row must not sink the rest of the batch
+            written = 0
+            for fields in batch:
+                if self._commit([fields], attempts=1):
+                    written += 1
+                else:
+                    failed.append(fields)
+            if failed:
+                self._dead_letter(failed)
+        
+        with self._lock:
+            self._pending.difference_update(fields['id'] for fields in batch)
+            self.stats['written'] += written
+            self.stats['dropped'] += len(failed)
+            if written:
+                self.stats['batches'] += 1
+
+    def _commit(self, rows, attempts=3):
+        for attempt in range(attempts):
+            try:
+                with self.app.app_context():
+                    db.session.add_all([Excuse(**fields) for fields in rows])
+                    db.session.commit()
+                return True
+            except Exception as e:
+                print(f"❌ Write-behind batch of {len(rows)} failed (attempt {attempt + 1}): {e}")
+                with self.app.app_context():
+                    db.session.rollback()
+                with self._lock:
+                    self.stats['errors'] += 1
+                if isinstance(e, IntegrityError):
+                    # Retrying the same rows would fail the same way
+                    return False
+                time.sleep(0.1 * (attempt + 1))
+        return False
+
+    def _dead_letter(self, rows):
+        try:
+            os.makedirs(os.path.dirname(self.dead_letter_path) or '.', exist_ok=True)
+            with open(self.dead_letter_path, 'a') as f:
+                f.writelines(json.dumps(fields, default=str) + '\n' for fields in rows)
+            print(f"❌ {len(rows)} excuses could not be written; saved to {self.dead_letter_path}")
+        except OSError as e:
+            print(f"❌ Lost {len(rows)} excuses (ids {[fields['id'] for fields in rows]}): {e}")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'batch_size': self.batch_size,
+                'flush_interval_ms': round(self.flush_interval * 1000),
+                'pending': len(self._pending),
+                **self.stats
+            }
+
+excuse_writer = None
+if app.config['WRITE_BEHIND_ENABLED']:
+    excuse_writer = ExcuseWriter(
+        app,
+        batch_size=app.config['WRITE_BEHIND_BATCH_SIZE'],
+        flush_interval=app.config['WRITE_BEHIND_FLUSH_MS'] / 1000.0,
+        id_block=app.config['WRITE_BEHIND_ID_BLOCK'],
+        dead_letter_path=app.config['WRITE_BEHIND_DEAD_LETTER_PATH']
+    )
+    # Commit whatever is still queued when the worker shuts down
+    atexit.register(excuse_writer.flush)
+
+def get_excuse(excuse_id):
+    """Load an Excuse, committing it first if it is still queued for write-behind.
+
+    An id another worker handed out but has not committed yet is waited for,
+    for about one write-behind flush interval.
+    """
+    try:
+        excuse_id = int(excuse_id)
+    except (TypeError, ValueError):
+        return None
+    if excuse_writer and excuse_writer.is_pending(excuse_id):
+        excuse_writer.flush()
+    excuse = db.session.get(Excuse, excuse_id)
+    if excuse is None and excuse_writer and excuse_writer.issued(excuse_id):
+        # Another worker returned this id and may not have committed it yet
+        deadline = time.monotonic() + excuse_writer.flush_interval + 0.5
+        while excuse is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+            excuse = db.session.get(Excuse, excuse_id)
+    return excuse
+
+# Usage tracking, ratings and favorites
+USAGE_FIELDS = ('times_used', 'last_used', 'effectiveness_rating', 'rating_count', 'is_favorite')
+
+# Stats deltas for one excuse, read from its row before the update below so
+# the favorite change is exact even if another worker changed the flag
+USAGE_STATS_SQL = db.text(
+    "WITH changed AS (SELECT user_id, category, urgency_level, language, :uses AS uses, "
+    "coalesce(:favorite - coalesce(is_favorite, 0), 0) AS favorites FROM excuse WHERE id = :id) "
+    "INSERT INTO excuse_stats (user_id, dimension, value, excuse_count, score_sum, favorite_count, times_used_sum, version) "
+    + " UNION ALL ".join(
+        ["SELECT user_id, 'all', '*', 0, 0.0, favorites, uses, 1 FROM changed"]
+        + [f"SELECT user_id, '{dimension}', coalesce({field}, ''), 0, 0.0, favorites, uses, 1 FROM changed"
+           for dimension, field in STATS_DIMENSIONS]
+    )
+    + " WHERE true ON CONFLICT (user_id, dimension, value) DO UPDATE SET "
+    "favorite_count = favorite_count + excluded.favorite_count, "
+    "times_used_sum = times_used_sum + excluded.times_used_sum, "
+    "version = version + 1"
+)
+
+# Relative updates, so batches from several workers add up instead of overwriting each other
+USAGE_UPDATE_SQL = db.text(
+    "UPDATE excuse SET "
+    "times_used = coalesce(times_used, 0) + :uses, "
+    "last_used = CASE WHEN :last_used IS NULL THEN last_used ELSE max(coalesce(last_used, :last_used), :last_used) END, "
+    "effectiveness_rating = CASE WHEN :rating_count > 0 THEN "
+    "(coalesce(effectiveness_rating, 0.0) * rating_count + :rating_sum) / (rating_count + :rating_count) "
+    "ELSE effectiveness_rating END, "
+    "rating_count = rating_count + :rating_count, "
+    "is_favorite = coalesce(:favorite, is_favorite) "
+    "WHERE id = :id"
+).bindparams(db.bindparam('last_used', type_=db.DateTime))
+
+class UsageRecorder:
+    """Collects "used", rating and favorite changes in memory and writes them in batches.
+
+    Changes to the same excuse are folded into one pending entry: a use
+    count, a rating sum and count, and the latest favorite flag. A background
+    thread writes everything pending every `flush_interval` seconds, or
+    sooner once `max_pending` excuses are waiting, in a single transaction.
+    Reads in this worker pass their rows through `merge` so they include
+    changes that are not written yet.
+    """
+    
+    def __init__(self, app, flush_interval=1.0, max_pending=500):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self._pending = {}
+        # The batch being written; still merged into reads until it commits
+        self._writing = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.stats = {'recorded': 0, 'written': 0, 'batches': 0, 'errors': 0}
+    
+    def record(self, excuse, uses=0, rating=None, favorite=None):
+        """Queue a change to `excuse` and return its USAGE_FIELDS with all pending changes applied.
+
+        `favorite` is True, False, 'toggle' or None to leave the flag alone.
+        """
+        committed = {field: getattr(excuse, field) for field in USAGE_FIELDS}
+        with self._lock:
+            self._ensure_thread()
+            entry = self._pending.get(excuse.id)
+            if entry is None:
+                current = self._merge_locked(excuse.id, dict(committed))
+                entry = self._pending[excuse.id] = {
+                    'user_id': excuse.user_id, 'uses': 0, 'last_used': None,
+                    'rating_sum': 0.0, 'rating_count': 0, 'favorite': None,
+                    'base_favorite': bool(current['is_favorite'])
+                }
+            if uses:
+                entry['uses'] += uses
+                entry['last_used'] = datetime.utcnow()
+            if rating is not None:
+                entry['rating_sum'] += rating
+                entry['rating_count'] += 1
+            if favorite == 'toggle':
+                favorite = not self._merge_locked(excuse.id, dict(committed))['is_favorite']
+            if favorite is not None:
+                entry['favorite'] = bool(favorite)
+            self.stats['recorded'] += 1
+            if len(self._pending) >= self.max_pending:
+                self._wake.set()
+            return self._merge_locked(excuse.id, committed)
+    
+    def merge(self, excuse_id, values):
+        """`values`, a dict holding some of USAGE_FIELDS, updated with unwritten changes"""
+        if not self._pending and not self._writing:
+            return values
+        with self._lock:
+            return self._merge_locked(excuse_id, values)
+    
+    def _merge_locked(self, excuse_id, values):
+        for batch in (self._writing, self._pending):
+            entry = batch.get(excuse_id)
+            if entry is None:
+                continue
+            if 'times_used' in values:
+                values['times_used'] = (values['times_used'] or 0) + entry['uses']
+            if 'last_used' in values and entry['last_used'] and (values['last_used'] is None or entry['last_used'] > values['last_used']):
+                values['last_used'] = entry['last_used']
+            if 'rating_count' in values and entry['rating_count']:
+                count = values['rating_count'] or 0
+                values['effectiveness_rating'] = (
+                    ((values.get('effectiveness_rating') or 0.0) * count + entry['rating_sum']) / (count + entry['rating_count'])
+                )
+                values['rating_count'] = count + entry['rating_count']
+            if 'is_favorite' in values and entry['favorite'] is not None:
+                values['is_favorite'] = entry['favorite']
+        return values
+    
+    def pending_totals(self, user_id):
+        """Favorite change and uses per excuse id not yet written for one user"""
+        favorites = 0
+        uses = {}
+        if not self._pending and not self._writing:
+            return favorites, uses
+        with self._lock:
+            for batch in (self._writing, self._pending):
+                for excuse_id, entry in batch.items():
+                    if entry['user_id'] != user_id:
+                        continue
+                    if entry['favorite'] is not None:
+                        favorites += int(entry['favorite']) - int(entry['base_favorite'])
+                    if entry['uses']:
+                        uses[excuse_id] = uses.get(excuse_id, 0) + entry['uses']
+        return favorites, uses
+    
+    def flush(self):
+        """Write everything pending now; failed batches are kept for the next try"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending or self._pid != os.getpid():
+                    return True
+                self._writing, self._pending = self._pending, {}
+            batch = self._writing
+            try:
+                self._write(batch)
+                written = True
+            except Exception as e:
+                print(f"❌ Usage batch of {len(batch)} excuses failed, will retry: {e}")
+                written = False
+            with self._lock:
+                self._writing = {}
+                if written:
+                    self.stats['written'] += len(batch)
+                    self.stats['batches'] += 1
+                else:
+                    self.stats['errors'] += 1
+                    self._requeue(batch)
+            return written
+    
+    def _requeue(self, batch):
+        # Caller holds self._lock; entries recorded since the batch was taken come after it
+        for excuse_id, entry in batch.items():
+            newer = self._pending.get(excuse_id)
+            if newer:
+                entry['uses'] += newer['uses']
+                entry['last_used'] = newer['last_used'] or entry['last_used']
+                entry['rating_sum'] += newer['rating_sum']
+                entry['rating_count'] += newer['rating_count']
+                if newer['favorite'] is not None:
+                    entry['favorite'] = newer['favorite']
+            self._pending[excuse_id] = entry
+    
+    def _write(self, batch):
+        rows = [
+            {
+                'id': excuse_id, 'uses': entry['uses'], 'last_used': entry['last_used'],
+                'rating_sum': entry['rating_sum'], 'rating_count': entry['rating_count'],
+                'favorite': entry['favorite']
+            }
+            for excuse_id, entry in batch.items()
+        ]
+        # Ratings alone do not touch the rollups
+        stats_rows = [row for row in rows if row['uses'] or row['favorite'] is not None]
+        with metrics.timer(stage='usage_flush'):
+            with self.app.app_context():
+                with db.engine.begin() as connection:
+                    if stats_rows:
+                        connection.execute(USAGE_STATS_SQL, [
+                            {'id': row['id'], 'uses': row['uses'], 'favorite': row['favorite']} for row in stats_rows
+                        ])
+                    connection.execute(USAGE_UPDATE_SQL, rows)
+    
+    def _ensure_thread(self):
+        # Caller holds self._lock. Started on first use so forked gunicorn workers each get their own
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            if self._pid != os.getpid():
+                self._pending = {}
+                self._writing = {}
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='usage-recorder', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+    
+    def snapshot(self):
+        with self._lock:
+            return {
+                'flush_interval_ms': round(self.flush_interval * 1000),
+                'pending': len(self._pending) + len(self._writing),
+                **self.stats
+            }
+
+usage_recorder = UsageRecorder(
+    app,
+    flush_interval=app.config['USAGE_FLUSH_SECONDS'],
+    max_pending=app.config['USAGE_MAX_PENDING']
+)
+# Write whatever is still pending when the worker shuts down
+atexit.register(usage_recorder.flush)
+
+# Circuit breaker guarding the OpenAI API
+class CircuitBreaker:
+    """Stops calling a failing upstream for a cool-down period.
+
+    The breaker opens after `failure_threshold` consecutive failures or
+    timeouts. Once `cooldown` seconds have passed it goes half-open and lets a
+    single trial call through: success closes it again, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = 'closed'
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._counts = {'successes': 0, 'failures': 0, 'timeouts': 0, 'rejected': 0}
+
+    def allow_request(self):
+        with self._lock:
+            if self._state == 'open':
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    self._counts['rejected'] += 1
+                    return False
+                self._state = 'half_open'
+                self._trial_in_flight = False
+            if self._state == 'half_open':
+                if self._trial_in_flight:
+                    self._counts['rejected'] += 1
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def release_trial(self):
+        """Give back a half-open trial that ended without reaching the upstream"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._counts['successes'] += 1
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+            self._state = 'closed'
+
+    def record_failure(self, timed_out=False):
+        with self._lock:
+            self._counts['timeouts' if timed_out else 'failures'] += 1
+            self._consecutive_failures += 1
+            self._trial_in_flight = False
+            if self._state == 'half_open' or self._consecutive_failures >= self.failure_threshold:
+                if self._state != 'open':
+                    print(f"🚧 OpenAI circuit opened after {self._consecutive_failures} failures")
+                self._state = 'open'
+                self._opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = 0.0
+            if self._state == 'open':
+                retry_in = max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+            return {
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'cooldown_seconds': self.cooldown,
+                'retry_in_seconds': round(retry_in, 1),
+                **self._counts
+            }
+
+# Cache of generated excuses, shared between gunicorn workers
+class ExcuseCache:
+    """Two-tier cache of LLM excuses keyed on normalized request parameters.
+
+    The in-process tier is an LRU of at most `max_entries` keys. The shared
+    tier is a small SQLite file that every worker reads and writes, so an
+    excuse generated by one worker can be served by the others. Each key holds
+    up to `variants` excuses; a key only counts as a hit once it has all of
+    them, so the first requests for a key still fill it with fresh text.
+    """
+
+    def __init__(self, path=None, max_entries=1024, ttl=3600, variants=3):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stores = 0
+        self.stats = {'memory_hits': 0, 'shared_hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def make_key(category, scenario, urgency, language):
+        scenario = re.sub(r'[^\w\s]', ' ', str(scenario).lower())
+        scenario = ' '.join(scenario.split())
+        return '|'.join([str(category).strip().lower(), str(urgency).strip().lower(),
+                         str(language).strip().lower(), scenario])
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS excuse_cache (
+                    id INTEGER PRIMARY KEY,
+                    cache_key TEXT NOT NULL,
+                    excuse TEXT NOT NULL,
+                    believability_score REAL NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_excuse_cache_key ON excuse_cache (cache_key, created_at);
+            """)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            variants = [v for v in self._entries.get(key, []) if v[2] > now - self.ttl]
+            if len(variants) >= self.variants:
+                self._entries.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return random.choice(variants)
+        
+        if self.path:
+            try:
+                rows = self._connect().execute(
+                    'SELECT excuse, believability_score, created_at FROM excuse_cache '
+                    'WHERE cache_key = ? AND created_at > ? ORDER BY created_at DESC LIMIT ?',
+                    (key, now - self.ttl, self.variants)
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"⚠️ Excuse cache read failed: {e}")
+                rows = []
+            if len(rows) >= self.variants:
+                with self._lock:
+                    self._remember(key, [tuple(row) for row in rows])
+                    self.stats['shared_hits'] += 1
+                return random.choice(rows)
+        
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def put(self, key, excuse_text, believability_score):
+        variant = (excuse_text, believability_score, time.time())
+        with self._lock:
+            self._remember(key, self._entries.get(key, []) + [variant])
+            self._stores += 1
+            prune = self._stores % 100 == 0
+        
+        if self.path:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    'INSERT INTO excuse_cache (cache_key, excuse, believability_score, created_at) VALUES (?, ?, ?, ?)',
+                    (key, *variant)
+                )
+                conn.execute(
+                    'DELETE FROM excuse_cache WHERE cache_key = ? AND id NOT IN '
+                    '(SELECT id FROM excuse_cache WHERE cache_key = ? ORDER BY created_at DESC LIMIT ?)',
+                    (key, key, self.variants)
+                )
+                if prune:
+                    conn.execute('DELETE FROM excuse_cache WHERE created_at < ?', (time.time() - self.ttl,))
+            except sqlite3.Error as e:
+                print(f"⚠️ Excuse cache write failed: {e}")
+
+    def _remember(self, key, variants):
+        # Caller holds self._lock
+        self._entries[key] = variants[-self.variants:]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.stats['memory_hits'] + self.stats['shared_hits'] + self.stats['misses']
+            hits = lookups - self.stats['misses']
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'variants_per_key': self.variants,
+                'shared': bool(self.path),
+                'hit_ratio': round(hits / lookups, 3) if lookups else 0.0,
+                **self.stats
+            }
+
+# Coalesces concurrent OpenAI requests into fewer upstream calls
+class RequestCoalescer:
+    """Gathers completion requests for a short window and batches them.
+
+    Requests sharing a key (the normalized cache key) are answered by a single
+    chat completion asking for `n` choices, one per waiting caller. A batch is
+    flushed when `window` seconds have passed since its first request or when
+    `max_batch` requests are waiting, whichever comes first.
+
+    Batches run on `executor` through `complete`, or, given an AsyncRuntime,
+    as `complete_async` coroutines on its event loop, so async mode does not
+    funnel them through a small thread pool.
+    """
+
+    def __init__(self, executor, complete, window=0.02, max_batch=8, runtime=None, complete_async=None):
+        self.executor = executor
+        self.complete = complete
+        self.runtime = runtime
+        self.complete_async = complete_async
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._queue = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self.stats = {'requests': 0, 'batches': 0, 'upstream_calls': 0}
+
+    def submit(self, key, prompt):
+        future = Future()
+        with self._cond:
+            self._ensure_thread()
+            self._queue.append((key, prompt, future))
+            self.stats['requests'] += 1
+            self._cond.notify()
+        return future
+
+    def _ensure_thread(self):
+        # Started on first use so forked gunicorn workers each get their own
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='llm-coalescer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                flush_at = time.monotonic() + self.window
+                while len(self._queue) < self.max_batch:
+                    remaining = flush_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+                
+                groups = OrderedDict()
+                for key, prompt, future in batch:
+                    groups.setdefault(key, (prompt, []))[1].append(future)
+                self.stats['batches'] += 1
+                self.stats['upstream_calls'] += len(groups)
+            
+            for prompt, futures in groups.values():
+                if self.runtime:
+                    self.runtime.submit(self._dispatch_async(prompt, futures))
+                else:
+                    self.executor.submit(self._dispatch, prompt, futures)
+
+    def _dispatch(self, prompt, futures):
+        # Every waiter's future is resolved whatever happens, so no caller waits out its budget
+        try:
+            self._resolve(futures, self.complete(prompt, len(futures)))
+        except Exception as e:
+            self._fail(futures, e)
+
+    async def _dispatch_async(self, prompt, futures):
+        try:
+            self._resolve(futures, await self.complete_async(prompt, len(futures)))
+        except Exception as e:
+            self._fail(futures, e)
+
+    @staticmethod
+    def _resolve(futures, texts):
+        if not texts:
+            raise ValueError('OpenAI returned no choices')
+        for i, future in enumerate(futures):
+            future.set_result(texts[i % len(texts)])
+
+    @staticmethod
+    def _fail(futures, error):
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                'window_ms': round(self.window * 1000),
+                'max_batch': self.max_batch,
+                'queued': len(self._queue),
+                **self.stats
+            }
+
+# Fallback excuse corpus
+class ExcuseCorpus:
+    """Fallback excuses compiled from excuses.json into a read-only SQLite file.
+
+    Excuses in each (language, category, urgency) bucket get consecutive ids,
+    so sampling is one random id and one primary-key lookup. The fallback
+    chain (unknown language -> en, category -> work, urgency -> medium) is
+    resolved at compile time into a table keyed on every known combination,
+    with '*' for unknown values. Workers keep only that small table in
+    memory; the excuse texts are read through the OS page cache, which all
+    workers share.
+
+    The source file is checked every `reload_interval` seconds. When it has
+    changed, the corpus is recompiled and atomically swapped in, and the
+    other workers pick up the new file on their next check.
+    """
+
+    DEFAULT_CORPUS = {
+        'en': {
+            'work': {
+                'medium': ["I'm not feeling well and need to rest today."],
+                'high': ["I have an emergency that requires immediate attention."],
+                'low': ["I have some personal matters to attend to."]
+            }
+        }
+    }
+
+    def __init__(self, source, path, reload_interval=5.0):
+        self.source = source
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._generation = 0
+        self._loaded_stat = None
+        self._failed_signature = None
+        self._next_check = 0.0
+        self._languages = self._categories = self._urgencies = frozenset()
+        self._resolution = {}
+        self.stats = {'entries': 0, 'buckets': 0, 'compiles': 0, 'reloads': 0}
+
+    def sample(self, language, category, urgency):
+        """Return a random excuse for the request, or None if nothing matches"""
+        self._refresh()
+        key = (
+            language if language in self._languages else '*',
+            category if category in self._categories else '*',
+            urgency if urgency in self._urgencies else '*'
+        )
+        bucket = self._resolution.get(key)
+        if bucket is None:
+            return None
+        first_id, size = bucket
+        row = self._connect().execute(
+            'SELECT text FROM excuse WHERE id = ?', (first_id + random.randrange(size),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.reload_interval if self.reload_interval > 0 else float('inf')
+            try:
+                if self._source_changed():
+                    self.compile()
+            except (OSError, ValueError, sqlite3.Error) as e:
+                # A half-edited source file shouldn't take the fallbacks down
+                self._failed_signature = self._source_signature()
+                print(f"❌ Could not compile {os.path.basename(self.source)}: {e}")
+                if not os.path.exists(self.path):
+                    # Nothing compiled to fall back on yet, so serve the built-in excuses
+                    try:
+                        self.compile(self.DEFAULT_CORPUS)
+                    except (OSError, sqlite3.Error) as e:
+                        print(f"❌ Could not compile the built-in excuses: {e}")
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return
+            if self._loaded_stat != (stat.st_ino, stat.st_mtime_ns):
+                self._load(stat)
+
+    def _source_signature(self):
+        try:
+            stat = os.stat(self.source)
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _source_changed(self):
+        if not os.path.exists(self.path):
+            return True
+        signature = self._source_signature()
+        if signature is None or signature == self._failed_signature:
+            # Keep serving the last compiled corpus
+            return False
+        try:
+            with sqlite3.connect(f"file:{self.path}?mode=ro", uri=True) as conn:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'source_signature'").fetchone()
+        except sqlite3.Error:
+            return True
+        return row is None or row[0] != signature
+
+    def compile(self, corpus=None):
+        """Build the compiled corpus from the source file, or from `corpus`, and swap it in"""
+        signature = self._source_signature()
+        if corpus is None and signature is None:
+            print(f"⚠️ {os.path.basename(self.source)} not found, using minimal fallbacks")
+            corpus = self.DEFAULT_CORPUS
+        elif corpus is None:
+            with open(self.source, 'r', encoding='utf-8') as f:
+                corpus = json.load(f)
+            if not isinstance(corpus, dict):
+                raise ValueError('expected an object of languages at the top level')
+        
+        buckets = {}
+        rows = []
+        for language, categories in corpus.items():
+            for category, urgencies in (categories.items() if isinstance(categories, dict) else ()):
+                for urgency, texts in (urgencies.items() if isinstance(urgencies, dict) else ()):
+                    texts = [text for text in texts if isinstance(text, str) and text.strip()] if isinstance(texts, list) else []
+                    if texts:
+                        buckets[(language, category, urgency)] = (len(rows) + 1, len(texts))
+                        rows.extend(texts)
+        
+        # Precompute the fallback chain for every known name plus '*' for unknown ones
+        languages = {language for language, _, _ in buckets} | {'*'}
+        categories = {category for _, category, _ in buckets} | {'*'}
+        urgencies = {urgency for _, _, urgency in buckets} | {'*'}
+        resolution = []
+        for language in languages:
+            resolved_language = language if language in corpus else 'en'
+            known_categories = corpus.get(resolved_language) or {}
+            for category in categories:
+                resolved_category = category if category in known_categories else 'work'
+                known_urgencies = known_categories.get(resolved_category) or {}
+                for urgency in urgencies:
+                    resolved_urgency = urgency if urgency in known_urgencies else 'medium'
+                    bucket = buckets.get((resolved_language, resolved_category, resolved_urgency))
+                    if bucket:
+                        resolution.append((language, category, urgency, *bucket))
+        
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript("""
+                CREATE TABLE excuse (id INTEGER PRIMARY KEY, text TEXT NOT NULL);
+                CREATE TABLE resolution (
+                    language TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    urgency TEXT NOT NULL,
+                    first_id INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    PRIMARY KEY (language, category, urgency)
+                );
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """)
+            conn.executemany('INSERT INTO excuse (id, text) VALUES (?, ?)', enumerate(rows, start=1))
+            conn.executemany('INSERT INTO resolution VALUES (?, ?, ?, ?, ?)', resolution)
+            conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+                ('source_signature', signature or ''),
+                ('compiled_at', datetime.utcnow().isoformat())
+            ])
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, self.path)
+        self.stats['compiles'] += 1
+        print(f"✅ Compiled {len(rows)} fallback excuses in {len(buckets)} buckets")
+
+    def _load(self, stat):
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            resolution = {
+                (language, category, urgency): (first_id, size)
+                for language, category, urgency, first_id, size in conn.execute('SELECT * FROM resolution')
+            }
+            entries = conn.execute('SELECT count(*) FROM excuse').fetchone()[0]
+        finally:
+            conn.close()
+        self._languages = frozenset(key[0] for key in resolution) - {'*'}
+        self._categories = frozenset(key[1] for key in resolution) - {'*'}
+        self._urgencies = frozenset(key[2] for key in resolution) - {'*'}
+        self._resolution = resolution
+        self._loaded_stat = (stat.st_ino, stat.st_mtime_ns)
+        self._generation += 1
+        self.stats['entries'] = entries
+        self.stats['buckets'] = len(set(resolution.values()))
+        self.stats['reloads'] += 1
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork or a reload
+        local = self._local
+        if getattr(local, 'generation', None) != self._generation or local.pid != os.getpid():
+            # immutable: the file is only ever replaced, never modified in place
+            local.conn = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+            local.generation = self._generation
+            local.pid = os.getpid()
+        return local.conn
+
+    def snapshot(self):
+        return {
+            'languages': sorted(self._languages),
+            'reload_interval_seconds': self.reload_interval,
+            **self.stats
+        }
+
+# Believability Scoring
+class BelievabilityScorer:
+    """Scores excuse texts from their length and the keywords they contain.
+
+    All keywords are compiled into one regex, so each text is lowercased and
+    scanned once. Keywords match as substrings, like the original scoring,
+    and the lookahead lets matches overlap. The regex reports only the
+    longest keyword at each position, so every keyword also counts the
+    configured keywords that are prefixes of it. `score_many` scores a batch of
+    texts for the backfill command.
+    """
+    
+    DEFAULT_WEIGHTS = {
+        'base': 5.0,
+        'ideal_length': [10, 40],
+        'ideal_length_bonus': 1.5,
+        'short_length': 5,
+        'long_length': 60,
+        'length_penalty': 1.0,
+        'specific_word_bonus': 0.5,
+        'specific_word_cap': 2.0,
+        'urgency_match_bonus': 1.5,
+        'max_score': 10.0,
+        'specific_words': ['doctor', 'meeting', 'emergency', 'appointment', 'family', 'car', 'sick', 'traffic', 'urgent', 'hospital'],
+        'urgency_words': {
+            'high': ['emergency', 'urgent', 'immediately', 'crisis', 'hospital', 'serious'],
+            'medium': ['appointment', 'meeting', 'issue', 'problem', 'doctor', 'important'],
+            'low': ['feeling', 'might', 'possibly', 'may', 'think', 'probably']
+        }
+    }
+    
+    def __init__(self, weights=None):
+        self.weights = dict(self.DEFAULT_WEIGHTS, **(weights or {}))
+        self.specific_words = frozenset(word.lower() for word in self.weights['specific_words'])
+        self.urgency_words = {
+            urgency: frozenset(word.lower() for word in words)
+            for urgency, words in self.weights['urgency_words'].items()
+        }
+        keywords = self.specific_words.union(*self.urgency_words.values())
+        # Longest first, so each position reports its longest keyword and `prefixes` adds the rest
+        alternation = '|'.join(re.escape(word) for word in sorted(keywords, key=len, reverse=True))
+        self.pattern = re.compile(f'(?=({alternation}))') if keywords else None
+        self.prefixes = {
+            word: frozenset(other for other in keywords if word.startswith(other))
+            for word in keywords
+        }
+    
+    def keywords_in(self, lowered_text):
+        if not self.pattern:
+            return frozenset()
+        return frozenset().union(*(self.prefixes[word] for word in set(self.pattern.findall(lowered_text))))
+    
+    def score(self, excuse_text, urgency='medium'):
+        weights = self.weights
+        score = weights['base']
+        length = len(excuse_text.split())
+        
+        low, high = weights['ideal_length']
+        if low <= length <= high:
+            score += weights['ideal_length_bonus']
+        elif length < weights['short_length'] or length > weights['long_length']:
+            score -= weights['length_penalty']
+        
+        found = self.keywords_in(excuse_text.lower())
+        specificity = len(found & self.specific_words)
+        score += min(specificity * weights['specific_word_bonus'], weights['specific_word_cap'])
+        
+        if found & self.urgency_words.get(urgency, frozenset()):
+            score += weights['urgency_match_bonus']
+        
+        return min(score, weights['max_score'])
+    
+    def score_many(self, excuse_texts, urgencies):
+        """Score parallel sequences of texts and urgency levels"""
+        score = self.score
+        return [score(text or '', urgency) for text, urgency in zip(excuse_texts, urgencies)]
+    
+    def snapshot(self):
+        return {key: value for key, value in self.weights.items() if key not in ('specific_words', 'urgency_words')}
+
+believability_scorer = BelievabilityScorer(app.config['SCORING_WEIGHTS'])
+
+@app.cli.command('rescore-excuses')
+@click.option('--chunk-size', default=None, type=int, help='Rows read and updated per transaction')
+@click.option('--dry-run', is_flag=True, help='Count the rows that would change without writing')
+def rescore_excuses_command(chunk_size, dry_run):
+    """Recompute believability_score for stored excuses with the current weights"""
+    chunk_size = chunk_size or app.config['RESCORE_CHUNK_SIZE']
+    last_id = 0
+    scanned = changed = 0
+    started = time.perf_counter()
+    
+    while True:
+        # Keyset pagination on the primary key; only one chunk is in memory
+        rows = db.session.execute(
+            db.select(Excuse.id, Excuse.excuse_text, Excuse.urgency_level, Excuse.believability_score)
+            .where(Excuse.id > last_id)
+            .order_by(Excuse.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        
+        scores = believability_scorer.score_many([row.excuse_text for row in rows], [row.urgency_level for row in rows])
+        updates = [
+            {'excuse_id': row.id, 'score': score}
+            for row, score in zip(rows, scores)
+            if row.believability_score is None or abs(row.believability_score - score) > 1e-9
+        ]
+        if updates and not dry_run:
+            db.session.execute(
+                db.update(Excuse.__table__).where(Excuse.__table__.c.id == db.bindparam('excuse_id')).values(believability_score=db.bindparam('score')),
+                updates
+            )
+        db.session.commit()
+        
+        last_id = rows[-1].id
+        scanned += len(rows)
+        changed += len(updates)
+        print(f"🔁 Rescored {scanned} excuses, {changed} changed (up to id {last_id})")
+    
+    if changed and not dry_run:
+        # The bulk UPDATEs above bypass the ORM hooks that maintain the rollups
+        rebuild_excuse_stats()
+    
+    verb = 'would change' if dry_run else 'changed'
+    print(f"✅ Rescored {scanned} excuses in {time.perf_counter() - started:.1f}s; {changed} {verb}")
+
+# Pre-generated excuse pools
+class ExcusePool:
+    """Buffers of ready, scored excuses per (category, urgency, language).
+
+    Items live in a SQLite file shared by all workers, and a claim deletes the
+    row it returns, so each excuse is handed out once. Workers count requests
+    and hits per key locally and add them to pool_demand on every refill
+    tick. The refill job runs in one worker at a time (under a maintenance
+    lease): it turns the recent request rate into a target of `lead_minutes`
+    worth of excuses, capped at `max_size`, and tops up keys that dropped
+    below `low_water` of their target with batched LLM calls. Keys nobody
+    asks for get a target of zero.
+
+    With scope 'generic', only requests without a specific scenario are
+    served from the pools; with 'all', every request is.
+    """
+    
+    def __init__(self, path, scope='generic', max_size=50, low_water=0.5, lead_minutes=10.0,
+                 batch_size=5, max_age_hours=24.0, refill_interval=15.0):
+        self.path = path
+        self.scope = scope
+        self.max_size = max_size
+        self.low_water = low_water
+        self.lead_minutes = lead_minutes
+        self.batch_size = max(1, batch_size)
+        self.max_age = max_age_hours * 3600
+        self.refill_interval = refill_interval
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._demand = {}
+        self._stocked = set()
+        self._stocked_at = 0.0
+        self.stats = {'hits': 0, 'misses': 0, 'generated': 0}
+    
+    def _connect(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS pool_item (
+                    id INTEGER PRIMARY KEY,
+                    category TEXT NOT NULL,
+                    urgency TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    excuse TEXT NOT NULL,
+                    believability_score REAL NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_pool_item_key ON pool_item (category, urgency, language, id);
+                CREATE TABLE IF NOT EXISTS pool_demand (
+                    category TEXT NOT NULL,
+                    urgency TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    requests INTEGER NOT NULL DEFAULT 0,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    pending INTEGER NOT NULL DEFAULT 0,
+                    rate REAL,
+                    target INTEGER NOT NULL DEFAULT 0,
+                    rated_at REAL NOT NULL,
+                    PRIMARY KEY (category, urgency, language)
+                );
+            """)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def applies_to(self, scenario):
+        if self.scope == 'all':
+            return True
+        return ' '.join(re.sub(r'[^\w\s]', ' ', str(scenario or '').lower()).split()) in ('', 'general')
+    
+    def take(self, category, urgency, language):
+        """Claim one pooled excuse as (excuse, believability_score), or None"""
+        key = (category, urgency, language)
+        row = None
+        # Only touch the database for keys that had stock a moment ago
+        if key in self.stocked_keys():
+            try:
+                row = self._connect().execute(
+                    'DELETE FROM pool_item WHERE id = (SELECT id FROM pool_item '
+                    'WHERE category = ? AND urgency = ? AND language = ? AND created_at > ? ORDER BY id LIMIT 1) '
+                    'RETURNING excuse, believability_score',
+                    (*key, time.time() - self.max_age)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"⚠️ Excuse pool read failed: {e}")
+        with self._lock:
+            counts = self._demand.setdefault(key, [0, 0])
+            counts[0] += 1
+            counts[1] += 1 if row else 0
+            self.stats['hits' if row else 'misses'] += 1
+            if not row:
+                self._stocked.discard(key)
+        return row
+    
+    def stocked_keys(self, max_age=2.0):
+        now = time.time()
+        if now - self._stocked_at > max_age:
+            try:
+                keys = self._connect().execute(
+                    'SELECT DISTINCT category, urgency, language FROM pool_item'
+                ).fetchall()
+                with self._lock:
+                    self._stocked = {tuple(key) for key in keys}
+            except sqlite3.Error as e:
+                print(f"⚠️ Excuse pool read failed: {e}")
+            self._stocked_at = now
+        return self._stocked
+    
+    def flush_demand(self):
+        """Add this worker's request counts to pool_demand"""
+        with self._lock:
+            demand, self._demand = self._demand, {}
+        if not demand:
+            return
+        try:
+            self._connect().executemany(
+                'INSERT INTO pool_demand (category, urgency, language, requests, hits, pending, rated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (category, urgency, language) DO UPDATE SET '
+                'requests = requests + excluded.requests, hits = hits + excluded.hits, pending = pending + excluded.pending',
+                [(*key, requests, hits, requests, time.time()) for key, (requests, hits) in demand.items()]
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Excuse pool demand update failed: {e}")
+            with self._lock:
+                for key, (requests, hits) in demand.items():
+                    counts = self._demand.setdefault(key, [0, 0])
+                    counts[0] += requests
+                    counts[1] += hits
+    
+    def refill(self, generator, renew=None):
+        """Retarget every key from recent demand and top up the ones running low.
+
+        Each upstream call takes one of the generator's admission slots and
+        is skipped when none is free, so refills never crowd out requests.
+        `renew(seconds)`, if given, extends the caller's lease before each
+        call and returns False once the lease is lost.
+        """
+        self.flush_demand()
+        conn = self._connect()
+        now = time.time()
+        conn.execute('DELETE FROM pool_item WHERE created_at <= ?', (now - self.max_age,))
+        depths = {
+            (category, urgency, language): depth
+            for category, urgency, language, depth in conn.execute(
+                'SELECT category, urgency, language, count(*) FROM pool_item GROUP BY category, urgency, language'
+            )
+        }
+        
+        generated = 0
+        deferred = False
+        low = []
+        for category, urgency, language, pending, rate, rated_at in conn.execute(
+            'SELECT category, urgency, language, pending, rate, rated_at FROM pool_demand'
+        ).fetchall():
+            # Requests per minute, smoothed so one burst does not swing the target
+            elapsed = max(now - rated_at, self.refill_interval) / 60
+            current = pending / elapsed
+            rate = current if rate is None else 0.7 * rate + 0.3 * current
+            target = min(self.max_size, int(rate * self.lead_minutes + 0.5))
+            if target < 2:
+                target = 0
+            conn.execute(
+                'UPDATE pool_demand SET pending = pending - ?, rate = ?, target = ?, rated_at = ? '
+                'WHERE category = ? AND urgency = ? AND language = ?',
+                (pending, rate, target, now, category, urgency, language)
+            )
+            depth = depths.get((category, urgency, language), 0)
+            if target and depth < target * self.low_water:
+                low.append((target - depth, category, urgency, language))
+        
+        # Neediest keys first, while the LLM is configured and healthy
+        for missing, category, urgency, language in sorted(low, reverse=True):
+            while missing > 0 and not deferred and app.config['OPENAI_API_KEY']:
+                # Long enough for the call below even when it runs into its timeout
+                if renew and not renew(max(self.refill_interval * 0.8, generator.timeout * 2)):
+                    deferred = True
+                    break
+                if not generator.slots.acquire(blocking=False):
+                    # Requests are using every slot; try again next round
+                    deferred = True
+                    break
+                # Asked last, so nothing above can strand the half-open trial
+                if not generator.breaker.allow_request():
+                    generator.slots.release()
+                    deferred = True
+                    break
+                count = min(missing, self.batch_size)
+                prompt = generator.build_prompt(category, 'general', urgency, language)
+                try:
+                    with metrics.timer(stage='pool_refill'):
+                        texts = generator.request_completion(prompt, n=count)
+                except Exception as e:
+                    generator.breaker.record_failure()
+                    print(f"❌ Excuse pool refill failed: {e}")
+                    break
+                finally:
+                    generator.slots.release()
+                generator.breaker.record_success()
+                scores = generator.scorer.score_many(texts, [urgency] * len(texts))
+                conn.executemany(
+                    'INSERT INTO pool_item (category, urgency, language, excuse, believability_score, created_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [(category, urgency, language, text, score, time.time()) for text, score in zip(texts, scores)]
+                )
+                missing -= len(texts)
+                generated += len(texts)
+        
+        with self._lock:
+            self.stats['generated'] += generated
+        self._stocked_at = 0.0
+        return {'low_keys': len(low), 'generated': generated, 'deferred': deferred}
+    
+    def snapshot(self):
+        keys = {}
+        try:
+            conn = self._connect()
+            for category, urgency, language, requests, hits, rate, target in conn.execute(
+                'SELECT category, urgency, language, requests, hits, rate, target FROM pool_demand ORDER BY requests DESC LIMIT 20'
+            ):
+                keys[f'{category}/{urgency}/{language}'] = {
+                    'depth': 0, 'target': target, 'requests': requests,
+                    'hit_rate': round(hits / requests, 3) if requests else 0.0,
+                    'requests_per_minute': round(rate or 0.0, 2)
+                }
+            for category, urgency, language, depth in conn.execute(
+                'SELECT category, urgency, language, count(*) FROM pool_item GROUP BY category, urgency, language'
+            ):
+                keys.setdefault(f'{category}/{urgency}/{language}', {'depth': 0})['depth'] = depth
+        except sqlite3.Error as e:
+            print(f"⚠️ Excuse pool read failed: {e}")
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                'scope': self.scope,
+                'max_size': self.max_size,
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+                **self.stats,
+                'keys': keys
+            }
+
+# Async serving mode
+class AsyncRuntime:
+    """An asyncio event loop on a background thread, one per worker process.
+
+    `submit` schedules a coroutine on it from any thread and returns a
+    concurrent.futures.Future, so request threads wait on it the same way
+    they wait on the thread pools. A call in flight costs a coroutine and a
+    socket rather than a thread. Calls share one aiohttp session whose
+    connector keeps at most `max_connections` connections. The loop starts
+    on first use, so forked gunicorn workers each get their own.
+    """
+    
+    def __init__(self, max_connections=256):
+        self.max_connections = max_connections
+        self._loop = None
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.stats = {'submitted': 0, 'cancelled': 0}
+    
+    def submit(self, coroutine):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+        self.stats['submitted'] += 1
+        return future
+    
+    def cancel(self, future):
+        # Cancelling the future cancels the task, which closes its connection
+        if future.cancel():
+            self.stats['cancelled'] += 1
+    
+    async def session(self):
+        # Only touched from the loop thread, so no lock is needed
+        if self._session is None or self._session.closed:
+            aiohttp = features.get('aiohttp')
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_connections))
+        return self._session
+    
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._session = None
+                self._pid = os.getpid()
+                threading.Thread(target=self._loop.run_forever, name='async-io', daemon=True).start()
+            return self._loop
+    
+    def snapshot(self):
+        loop = self._loop if self._pid == os.getpid() else None
+        return {
+            'running': bool(loop and loop.is_running()),
+            'max_connections': self.max_connections,
+            'tasks': len(asyncio.all_tasks(loop)) if loop else 0,
+            **self.stats
+        }
+
+async_runtime = AsyncRuntime(app.config['ASYNC_MAX_CONNECTIONS']) if app.config['ASYNC_MODE'] else None
+
 # Excuse Generation Service
 class ExcuseGenerator:
-    def __init__(self):
+    def __init__(self, corpus, timeout=6.0, max_workers=8, breaker=None, cache=None, batch_window=0.0, batch_max_size=8, scorer=None, pool=None, max_in_flight=16, runtime=None):
+        self.corpus = corpus
+        # Event loop for upstream calls in async mode; None keeps them on the thread pool
+        self.runtime = runtime
+        self.scorer = scorer or BelievabilityScorer()
+        self.pool = pool
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.cache = cache
+        # Upstream calls run on this pool so the request thread can stop
+        # waiting once the latency budget is spent. Without an event loop it
+        # has a thread for every admission slot, so admitted calls never queue
+        if runtime is None:
+            max_workers = max(max_workers, max_in_flight)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+        # Admission control: calls beyond this many get a fallback rather than a queue slot
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.coalescer = None
+        if batch_window > 0:
+            self.coalescer = RequestCoalescer(self.executor, self.request_completion,
+                                              window=batch_window, max_batch=batch_max_size,
+                                              runtime=runtime, complete_async=self.request_completion_async)
+        
         self.language_prompts = {
             'en': "Generate a believable excuse in English",
             'hi': "हिंदी में एक विश्वसनीय बहाना बनाएं",
@@ -84,33 +2374,186 @@ class ExcuseGenerator:
             'fr': "Générez une excuse crédible en français",
             'de': "Generieren Sie eine glaubwürdige Entschuldigung auf Deutsch"
         }
+    
+    def generate_excuse(self, category, scenario, urgency='medium', language='en'):
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.make_key(category, scenario, urgency, language)
+            with metrics.timer(stage='cache_lookup'):
+                cached = self.cache.get(cache_key)
+            if cached:
+                return {
+                    'excuse': cached[0],
+                    'believability_score': cached[1],
+                    'category': category,
+                    'scenario': scenario,
+                    'urgency': urgency,
+                    'source': 'cache'
+                }
+        
+        pooled = self.take_pooled(category, scenario, urgency, language)
+        if pooled:
+            return pooled
         
-        # Load excuses from JSON file
+        if not app.config['OPENAI_API_KEY']:
+            metrics.inc('llm_fallbacks_total', reason='no_api_key')
+            return self.get_fallback_excuse(category, scenario, urgency, language)
+        
+        # Slot first, so a refused call never holds the breaker's half-open trial
+        if not self.slots.acquire(blocking=False):
+            metrics.inc('llm_fallbacks_total', reason='overloaded')
+            return self.get_fallback_excuse(category, scenario, urgency, language)
+        
+        if not self.breaker.allow_request():
+            self.slots.release()
+            metrics.inc('llm_fallbacks_total', reason='circuit_open')
+            return self.get_fallback_excuse(category, scenario, urgency, language)
+        
+        prompt = self.build_prompt(category, scenario, urgency, language)
+        
+        if self.coalescer:
+            future = self.coalescer.submit(cache_key or prompt, prompt)
+        elif self.runtime:
+            future = self.runtime.submit(self.complete_async(prompt))
+        else:
+            future = self.executor.submit(lambda: self.request_completion(prompt)[0])
+        # Held until the upstream call ends, even if this request stops waiting
+        future.add_done_callback(lambda _: self.slots.release())
         try:
-            with open('excuses.json', 'r', encoding='utf-8') as f:
-                self.excuses_db = json.load(f)
-            print("✅ Loaded excuses database from excuses.json")
-        except FileNotFoundError:
-            print("⚠️ excuses.json not found, using minimal fallbacks")
-            self.excuses_db = {
-                'en': {
-                    'work': {
-                        'medium': ["I'm not feeling well and need to rest today."],
-                        'high': ["I have an emergency that requires immediate attention."],
-                        'low': ["I have some personal matters to attend to."]
-                    }
+            with metrics.timer(stage='llm'):
+                excuse_text = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            if not self.runtime and not self.coalescer and future.cancel():
+                # Still queued behind other pool work (e.g. a pool refill), so
+                # this says nothing about the upstream's health
+                self.breaker.release_trial()
+                metrics.inc('llm_fallbacks_total', reason='overloaded')
+                return self.get_fallback_excuse(category, scenario, urgency, language)
+            if self.runtime and not self.coalescer:
+                # A thread cannot be stopped, but a coroutine can
+                self.runtime.cancel(future)
+            self.breaker.record_failure(timed_out=True)
+            metrics.inc('llm_fallbacks_total', reason='timeout')
+            return self.get_fallback_excuse(category, scenario, urgency, language)
+        except Exception as e:
+            self.breaker.record_failure()
+            metrics.inc('llm_fallbacks_total', reason='error')
+            print(f"❌ OpenAI API Error: {e}")
+            return self.get_fallback_excuse(category, scenario, urgency, language)
+        
+        self.breaker.record_success()
+        return self.finish_excuse(excuse_text, category, scenario, urgency, cache_key)
+    
+    def stream_excuse(self, category, scenario, urgency='medium', language='en'):
+        """Generate an excuse token by token.
+
+        Yields ('token', text) as text arrives and finally ('done', excuse_data)
+        with the same fields generate_excuse returns. If the stream fails after
+        some tokens were sent, ('reset', None) tells the client to discard them
+        before the fallback excuse follows.
+        """
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.make_key(category, scenario, urgency, language)
+            cached = self.cache.get(cache_key)
+            if cached:
+                yield 'token', cached[0]
+                yield 'done', {
+                    'excuse': cached[0],
+                    'believability_score': cached[1],
+                    'category': category,
+                    'scenario': scenario,
+                    'urgency': urgency,
+                    'source': 'cache'
                 }
-            }
+                return
+        
+        pooled = self.take_pooled(category, scenario, urgency, language)
+        if pooled:
+            yield 'token', pooled['excuse']
+            yield 'done', pooled
+            return
+        
+        if not app.config['OPENAI_API_KEY']:
+            reason = 'no_api_key'
+        elif not self.slots.acquire(blocking=False):
+            reason = 'overloaded'
+        elif not self.breaker.allow_request():
+            self.slots.release()
+            reason = 'circuit_open'
+        else:
+            reason = None
+        if reason:
+            metrics.inc('llm_fallbacks_total', reason=reason)
+            excuse_data = self.get_fallback_excuse(category, scenario, urgency, language)
+            yield 'token', excuse_data['excuse']
+            yield 'done', excuse_data
+            return
+        
+        parts = []
+        started = time.perf_counter()
+        try:
+            for text in self.stream_completion(self.build_prompt(category, scenario, urgency, language)):
+                if not parts:
+                    metrics.observe('excuse_stage_duration_seconds', time.perf_counter() - started, stage='llm_first_token')
+                parts.append(text)
+                yield 'token', text
         except Exception as e:
-            print(f"❌ Error loading excuses: {e}")
-            self.excuses_db = {}
+            timed_out = isinstance(e, features.get('openai').error.Timeout)
+            self.breaker.record_failure(timed_out=timed_out)
+            metrics.inc('llm_fallbacks_total', reason='timeout' if timed_out else 'error')
+            print(f"❌ OpenAI streaming error: {e}")
+            if parts:
+                yield 'reset', None
+            excuse_data = self.get_fallback_excuse(category, scenario, urgency, language)
+            yield 'token', excuse_data['excuse']
+            yield 'done', excuse_data
+            return
+        except GeneratorExit:
+            # The client went away mid-stream; that says nothing about the upstream
+            self.breaker.release_trial()
+            raise
+        finally:
+            self.slots.release()
+        
+        self.breaker.record_success()
+        metrics.observe('excuse_stage_duration_seconds', time.perf_counter() - started, stage='llm')
+        yield 'done', self.finish_excuse(''.join(parts).strip(), category, scenario, urgency, cache_key)
     
-    def generate_excuse(self, category, scenario, urgency='medium', language='en'):
-        if not openai.api_key:
-            print("⚠️ No OpenAI API key found. Using fallback excuses.")
-            return self.get_fallback_excuse(category, scenario, urgency, language)
-            
-        prompt = f"""
+    def finish_excuse(self, excuse_text, category, scenario, urgency, cache_key=None):
+        with metrics.timer(stage='scoring'):
+            believability_score = self.calculate_believability(excuse_text, category, urgency)
+        if cache_key:
+            with metrics.timer(stage='cache_store'):
+                self.cache.put(cache_key, excuse_text, believability_score)
+        
+        return {
+            'excuse': excuse_text,
+            'believability_score': believability_score,
+            'category': category,
+            'scenario': scenario,
+            'urgency': urgency,
+            'source': 'llm'
+        }
+    
+    def take_pooled(self, category, scenario, urgency, language):
+        if not self.pool or not self.pool.applies_to(scenario):
+            return None
+        with metrics.timer(stage='pool_lookup'):
+            pooled = self.pool.take(category, urgency, language)
+        if not pooled:
+            return None
+        return {
+            'excuse': pooled[0],
+            'believability_score': pooled[1],
+            'category': category,
+            'scenario': scenario,
+            'urgency': urgency,
+            'source': 'pool'
+        }
+    
+    def build_prompt(self, category, scenario, urgency, language):
+        return f"""
         {self.language_prompts.get(language, self.language_prompts['en'])} for:
         
         Category: {category}
@@ -126,82 +2569,81 @@ class ExcuseGenerator:
         
         Generate only the excuse text:
         """
-        
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that generates believable, professional excuses."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=150,
-                temperature=0.8
-            )
-            
-            excuse_text = response.choices[0].message['content'].strip()
-            believability_score = self.calculate_believability(excuse_text, category, urgency)
-            
-            print(f"✅ Generated AI excuse: {excuse_text[:50]}...")
-            
-            return {
-                'excuse': excuse_text,
-                'believability_score': believability_score,
-                'category': category,
-                'scenario': scenario,
-                'urgency': urgency
-            }
-            
-        except Exception as e:
-            print(f"❌ OpenAI API Error: {e}")
-            print("🔄 Falling back to predefined excuses...")
-            return self.get_fallback_excuse(category, scenario, urgency, language)
+    
+    def completion_messages(self, prompt):
+        return [
+            {"role": "system", "content": "You are a helpful assistant that generates believable, professional excuses."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def completion_options(self, prompt, n=1):
+        return dict(
+            model="gpt-3.5-turbo",
+            messages=self.completion_messages(prompt),
+            max_tokens=150,
+            temperature=0.8,
+            n=n,
+            # Let the HTTP call give up around the same time the caller does
+            request_timeout=self.timeout
+        )
+    
+    def completion_texts(self, response):
+        usage = response.get('usage') or {}
+        metrics.inc('llm_tokens_total', usage.get('prompt_tokens', 0), kind='prompt')
+        metrics.inc('llm_tokens_total', usage.get('completion_tokens', 0), kind='completion')
+        return [choice.message['content'].strip() for choice in response.choices]
+    
+    def request_completion(self, prompt, n=1):
+        response = features.get('openai').ChatCompletion.create(**self.completion_options(prompt, n))
+        return self.completion_texts(response)
+    
+    async def request_completion_async(self, prompt, n=1):
+        """request_completion for async mode, run on the runtime's event loop"""
+        openai = features.get('openai')
+        # Context variables are per task, so this only affects this call
+        openai.aiosession.set(await self.runtime.session())
+        response = await openai.ChatCompletion.acreate(**self.completion_options(prompt, n))
+        return self.completion_texts(response)
+    
+    async def complete_async(self, prompt):
+        """request_completion(prompt)[0] for async mode"""
+        return (await self.request_completion_async(prompt))[0]
+    
+    def stream_completion(self, prompt):
+        response = features.get('openai').ChatCompletion.create(
+            model="gpt-3.5-turbo",
+            messages=self.completion_messages(prompt),
+            max_tokens=150,
+            temperature=0.8,
+            stream=True,
+            # Bounds the wait for the first token and for each one after it
+            request_timeout=self.timeout
+        )
+        for chunk in response:
+            text = chunk.choices[0].delta.get('content') if chunk.choices else None
+            if text:
+                yield text
     
     def calculate_believability(self, excuse_text, category, urgency):
-        score = 5.0
-        length = len(excuse_text.split())
-        
-        if 10 <= length <= 40:
-            score += 1.5
-        elif length < 5 or length > 60:
-            score -= 1.0
-        
-        specific_words = ['doctor', 'meeting', 'emergency', 'appointment', 'family', 'car', 'sick', 'traffic', 'urgent', 'hospital']
-        specificity = sum(1 for word in specific_words if word in excuse_text.lower())
-        score += min(specificity * 0.5, 2.0)
-        
-        urgency_words = {
-            'high': ['emergency', 'urgent', 'immediately', 'crisis', 'hospital', 'serious'],
-            'medium': ['appointment', 'meeting', 'issue', 'problem', 'doctor', 'important'],
-            'low': ['feeling', 'might', 'possibly', 'may', 'think', 'probably']
-        }
-        
-        if any(word in excuse_text.lower() for word in urgency_words.get(urgency, [])):
-            score += 1.5
-        
-        return min(score, 10.0)
+        return self.scorer.score(excuse_text, urgency)
     
     def get_fallback_excuse(self, category, scenario, urgency, language='en'):
-        # Get excuses from loaded database
+        # Get excuses from the compiled corpus
         try:
-            language_excuses = self.excuses_db.get(language, self.excuses_db.get('en', {}))
-            category_excuses = language_excuses.get(category, language_excuses.get('work', {}))
-            excuse_options = category_excuses.get(urgency, category_excuses.get('medium', ['I need to handle something important today.']))
-            
-            # Randomly select an excuse
-            excuse_text = random.choice(excuse_options)
+            with metrics.timer(stage='fallback'):
+                excuse_text = self.corpus.sample(language, category, urgency) or 'I need to handle something important today.'
             
             # Calculate believability score
             base_score = {'low': 6.5, 'medium': 7.5, 'high': 8.5}
             score = base_score.get(urgency, 7.5) + random.uniform(-0.8, 1.2)
             
-            print(f"📝 Selected excuse from database: {excuse_text[:50]}...")
-            
             return {
                 'excuse': excuse_text,
                 'believability_score': min(max(score, 5.0), 10.0),
                 'category': category,
                 'scenario': scenario,
-                'urgency': urgency
+                'urgency': urgency,
+                'source': 'fallback'
             }
             
         except Exception as e:
@@ -211,19 +2653,680 @@ class ExcuseGenerator:
                 'believability_score': 7.0,
                 'category': category,
                 'scenario': scenario,
-                'urgency': urgency
+                'urgency': urgency,
+                'source': 'fallback'
+            }
+
+excuse_generator = ExcuseGenerator(
+    ExcuseCorpus(
+        app.config['CORPUS_SOURCE'],
+        app.config['CORPUS_PATH'],
+        reload_interval=app.config['CORPUS_RELOAD_SECONDS']
+    ),
+    timeout=app.config['LLM_TIMEOUT_SECONDS'],
+    max_workers=app.config['LLM_MAX_WORKERS'],
+    breaker=CircuitBreaker(
+        failure_threshold=app.config['LLM_BREAKER_THRESHOLD'],
+        cooldown=app.config['LLM_BREAKER_COOLDOWN']
+    ),
+    cache=ExcuseCache(
+        path=app.config['EXCUSE_CACHE_PATH'],
+        max_entries=app.config['EXCUSE_CACHE_MAX_ENTRIES'],
+        ttl=app.config['EXCUSE_CACHE_TTL_SECONDS'],
+        variants=app.config['EXCUSE_CACHE_VARIANTS']
+    ) if app.config['EXCUSE_CACHE_ENABLED'] else None,
+    batch_window=app.config['LLM_BATCH_WINDOW_MS'] / 1000.0,
+    batch_max_size=app.config['LLM_BATCH_MAX_SIZE'],
+    scorer=believability_scorer,
+    max_in_flight=app.config['LLM_MAX_IN_FLIGHT'],
+    runtime=async_runtime,
+    pool=ExcusePool(
+        app.config['POOL_PATH'],
+        scope=app.config['POOL_SCOPE'],
+        max_size=app.config['POOL_MAX_SIZE'],
+        low_water=app.config['POOL_LOW_WATER'],
+        lead_minutes=app.config['POOL_LEAD_MINUTES'],
+        batch_size=app.config['POOL_BATCH_SIZE'],
+        max_age_hours=app.config['POOL_MAX_AGE_HOURS'],
+        refill_interval=app.config['POOL_REFILL_SECONDS']
+    ) if app.config['POOL_ENABLED'] else None
+)
+
+# Text-to-speech backends, selected with TTS_BACKEND
+class GTTSBackend:
+    name = 'gtts'
+
+    @property
+    def available(self):
+        return features.available('tts')
+
+    def synthesize(self, text, language, speed, path):
+        gTTS = features.get('tts')
+        gTTS(text=text, lang=language, slow=(speed == 'slow')).save(path)
+
+class StubTTSBackend:
+    """Writes a few silent MP3 frames without touching the network"""
+    name = 'stub'
+    available = True
+    # 128 kbps / 44.1 kHz MPEG-1 Layer III frame header, padded to a full frame
+    SILENT_FRAME = b'\xff\xfb\x90\x64' + b'\x00' * 413
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def synthesize(self, text, language, speed, path):
+        if self.delay:
+            time.sleep(self.delay)
+        with open(path, 'wb') as f:
+            f.write(self.SILENT_FRAME * 8)
+
+TTS_BACKENDS = {
+    'gtts': lambda: GTTSBackend(),
+    'stub': lambda: StubTTSBackend(delay=app.config['TTS_STUB_DELAY_MS'] / 1000.0)
+}
+
+class VoiceSynthesizer:
+    """Content-addressed audio cache with background synthesis jobs.
+
+    Audio is stored as <sha256(text, language, speed)>.mp3, so the same
+    excuse is only synthesized once and every worker can serve it. The hash
+    doubles as the job id. The directory is capped at `max_bytes`; the least
+    recently used files are deleted first, and a cache hit refreshes the
+    file's mtime.
+
+    Job state lives next to the audio, so any worker can answer for a job
+    another one started: a job is pending while its <key>.mp3.*.tmp file
+    exists (files older than `stale_after` seconds are left over from a dead
+    worker and ignored), and <key>.failed holds the error of a failed one.
+    """
+
+    def __init__(self, backend, directory, max_bytes, max_workers=4, stale_after=600.0):
+        self.backend = backend
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stale_after = stale_after
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tts')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'synthesized': 0, 'failed': 0, 'evicted': 0}
+
+    @staticmethod
+    def audio_key(text, language, speed):
+        return hashlib.sha256(f"{language}\x00{speed}\x00{text}".encode('utf-8')).hexdigest()
+
+    def audio_path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def failure_path(self, key):
+        return os.path.join(self.directory, f"{key}.failed")
+
+    def audio_url(self, key):
+        relative = os.path.relpath(self.audio_path(key), app.static_folder)
+        if relative.startswith(os.pardir):
+            # Cache lives outside static/, so serve it through the jobs API
+            return f"/api/voice-jobs/{key}/audio"
+        return f"{app.static_url_path}/{relative.replace(os.sep, '/')}"
+
+    def lookup(self, key):
+        path = self.audio_path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self.stats['hits'] += 1
+        return path
+
+    def submit(self, text, language, speed):
+        """Start synthesizing unless the audio is cached or already in progress"""
+        key = self.audio_key(text, language, speed)
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is None:
+                self.stats['misses'] += 1
+                # The temporary file marks the job as pending for every worker until it ends
+                os.makedirs(self.directory, exist_ok=True)
+                tmp_path = f"{self.audio_path(key)}.{os.getpid()}.{os.urandom(4).hex()}.tmp"
+                open(tmp_path, 'wb').close()
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self.failure_path(key))
+                future = self.executor.submit(self._synthesize, key, text, language, speed, tmp_path)
+                self._jobs[key] = future
+        return key, future
+
+    def status(self, key):
+        if os.path.exists(self.audio_path(key)):
+            return 'ready', None
+        with self._lock:
+            if key in self._jobs:
+                return 'pending', None
+        now = time.time()
+        for tmp_path in glob.glob(f"{glob.escape(self.audio_path(key))}.*.tmp"):
+            with contextlib.suppress(FileNotFoundError):
+                if now - os.path.getmtime(tmp_path) < self.stale_after:
+                    return 'pending', None
+        try:
+            with open(self.failure_path(key), encoding='utf-8') as f:
+                return 'failed', f.read()
+        except FileNotFoundError:
+            return 'unknown', None
+
+    def wait(self, key, timeout):
+        """Path of the finished audio, or None for an unknown job.
+
+        Waits up to `timeout` for a job running in any worker, then raises
+        FutureTimeoutError. A failed job raises its error.
+        """
+        with self._lock:
+            future = self._jobs.get(key)
+        if future is not None:
+            future.result(timeout=timeout)
+            return self.lookup(key)
+        
+        deadline = time.monotonic() + timeout
+        status, error = self.status(key)
+        while status == 'pending':
+            if time.monotonic() >= deadline:
+                raise FutureTimeoutError()
+            time.sleep(0.1)
+            status, error = self.status(key)
+        if status == 'failed':
+            raise RuntimeError(error)
+        return self.lookup(key)
+
+    def _synthesize(self, key, text, language, speed, tmp_path):
+        path = self.audio_path(key)
+        try:
+            with metrics.timer(stage='tts', backend=self.backend.name):
+                self.backend.synthesize(text, language, speed, tmp_path)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self.stats['synthesized'] += 1
+            self.evict(keep=path)
+            return path
+        except Exception as e:
+            with self._lock:
+                self.stats['failed'] += 1
+            with contextlib.suppress(OSError):
+                with open(self.failure_path(key), 'w', encoding='utf-8') as f:
+                    f.write(str(e))
+            raise
+        finally:
+            with self._lock:
+                self._jobs.pop(key, None)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def evict(self, keep=None):
+        files = []
+        total = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith('.mp3') and entry.is_file() and entry.path != keep:
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self.stats['evicted'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'backend': self.backend.name,
+                'max_mb': self.max_bytes // (1024 * 1024),
+                'jobs_in_flight': len(self._jobs),
+                **self.stats
+            }
+
+voice_synthesizer = VoiceSynthesizer(
+    TTS_BACKENDS[app.config['TTS_BACKEND']](),
+    app.config['TTS_CACHE_DIR'],
+    app.config['TTS_CACHE_MAX_MB'] * 1024 * 1024,
+    max_workers=app.config['TTS_MAX_WORKERS']
+)
+
+# Background maintenance
+class MaintenanceScheduler:
+    """Runs housekeeping jobs on an APScheduler thread in every worker.
+
+    Each job first takes a lease row in maintenance_lease. Only the process
+    holding an unexpired lease runs the job, so with several gunicorn workers
+    every job still runs once per interval. Leases expire on their own, so a
+    worker that dies does not block the others.
+
+    Jobs:
+    - artifacts: delete generated audio and proof files past their retention
+      age, then the oldest ones while a directory is over its size quota, and
+      drop ProofDocument rows whose file or excuse no longer exists.
+    - database: ANALYZE, plus VACUUM when enough pages are free. Runs daily
+      at `db_hour` (server local time), when traffic is lowest.
+    """
+    
+    def __init__(self, app, interval_minutes=15, artifact_rules=(), db_hour=4, vacuum_min_free_ratio=0.2):
+        self.app = app
+        self.interval = interval_minutes * 60
+        self.artifact_rules = artifact_rules
+        self.db_hour = db_hour
+        self.vacuum_min_free_ratio = vacuum_min_free_ratio
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self._jobs = []
+        self._scheduler = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def add_job(self, name, function, seconds, exclusive=True):
+        """Run `function` every `seconds`; in one worker at a time unless `exclusive` is False"""
+        self._jobs.append((name, function, seconds, exclusive))
+    
+    def run_local(self, function):
+        with self.app.app_context():
+            try:
+                function()
+            except Exception as e:
+                print(f"❌ Background job failed: {e}")
+    
+    def start(self):
+        """Start the scheduler thread in this process; later calls are no-ops"""
+        with self._lock:
+            if self._scheduler and self._pid == os.getpid():
+                return
+            try:
+                BackgroundScheduler = features.get('scheduler')
+            except FeatureUnavailable:
+                return
+            self.holder = f"{socket.gethostname()}:{os.getpid()}"
+            self._pid = os.getpid()
+            self._scheduler = BackgroundScheduler(daemon=True)
+            self._scheduler.add_job(
+                self.run_exclusive, 'interval', args=['artifacts', self.prune_artifacts, self.interval * 0.8],
+                seconds=self.interval, jitter=min(60, self.interval // 10), next_run_time=datetime.now() + timedelta(seconds=30),
+                id='artifacts', coalesce=True, max_instances=1
+            )
+            self._scheduler.add_job(
+                self.run_exclusive, 'cron', args=['database', self.optimize_database, 3600],
+                hour=self.db_hour, jitter=600, id='database', coalesce=True, max_instances=1
+            )
+            for name, function, seconds, exclusive in self._jobs:
+                self._scheduler.add_job(
+                    self.run_exclusive if exclusive else self.run_local,
+                    'interval', args=[name, function, seconds * 0.8] if exclusive else [function],
+                    seconds=seconds, id=name, coalesce=True, max_instances=1
+                )
+            self._scheduler.start()
+            print(f"🧹 Maintenance scheduler started (artifacts every {self.interval // 60} min, database at {self.db_hour:02d}:00)")
+    
+    def shutdown(self):
+        with self._lock:
+            if self._scheduler and self._pid == os.getpid():
+                self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+    
+    def acquire(self, name, ttl):
+        now = datetime.utcnow()
+        statement = db.text(
+            "INSERT INTO maintenance_lease (name, holder, expires_at) VALUES (:name, :holder, :expires_at) "
+            "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+            "WHERE maintenance_lease.expires_at <= :now OR maintenance_lease.holder = excluded.holder "
+            "RETURNING holder"
+        ).bindparams(db.bindparam('expires_at', type_=db.DateTime), db.bindparam('now', type_=db.DateTime))
+        row = db.session.execute(statement, {
+            'name': name, 'holder': self.holder,
+            'expires_at': now + timedelta(seconds=ttl), 'now': now
+        }).first()
+        db.session.commit()
+        return row is not None
+    
+    def run_exclusive(self, name, job, ttl):
+        """Run `job` if this process wins the lease; returns its result or None"""
+        with self.app.app_context():
+            try:
+                if not self.acquire(name, ttl):
+                    return None
+                result = job()
+                status = 'ok'
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Maintenance job {name} failed: {e}")
+                result = {'error': str(e)}
+                status = 'error'
+            metrics.inc('maintenance_runs_total', job=name, result=status)
+            try:
+                lease = db.session.get(MaintenanceLease, name)
+                if lease:
+                    lease.last_run_at = datetime.utcnow()
+                    lease.last_result = json.dumps(result)
+                    db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️ Could not record maintenance result for {name}: {e}")
+            return result
+    
+    def prune_artifacts(self):
+        result = {}
+        for directory, max_age_days, max_mb in self.artifact_rules:
+            removed, freed, remaining = self.prune_directory(directory, max_age_days * 86400, max_mb * 1024 * 1024)
+            if removed:
+                metrics.inc('maintenance_files_removed_total', removed, directory=os.path.basename(directory))
+            result[os.path.relpath(directory, self.app.root_path)] = {
+                'removed': removed, 'freed_bytes': freed, 'remaining_bytes': remaining
+            }
+        result['orphan_proofs_removed'] = self.remove_orphan_proofs()
+        return result
+    
+    @staticmethod
+    def prune_directory(directory, max_age, max_bytes):
+        """Delete files older than `max_age` seconds, then the oldest until under `max_bytes`"""
+        now = time.time()
+        files = []
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        removed = freed = 0
+        for mtime, size, path in files:
+            age = now - mtime
+            # Leave files that may still be being written
+            if age < 60 or (age <= max_age and total <= max_bytes):
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            freed += size
+            removed += 1
+        return removed, freed, total
+    
+    def remove_orphan_proofs(self, chunk_size=1000):
+        """Delete ProofDocument rows whose file is gone or whose excuse was deleted"""
+        removed = 0
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                db.select(ProofDocument.id, ProofDocument.file_path, Excuse.id.label('excuse_id'))
+                .outerjoin(Excuse, Excuse.id == ProofDocument.excuse_id)
+                .where(ProofDocument.id > last_id)
+                .order_by(ProofDocument.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            orphans = []
+            for row in rows:
+                path = os.path.join(self.app.root_path, row.file_path)
+                if row.excuse_id is None:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(path)
+                    orphans.append(row.id)
+                elif not os.path.exists(path):
+                    orphans.append(row.id)
+            if orphans:
+                db.session.execute(db.delete(ProofDocument).where(ProofDocument.id.in_(orphans)))
+                db.session.commit()
+                removed += len(orphans)
+            last_id = rows[-1].id
+        return removed
+    
+    def optimize_database(self):
+        if db.engine.url.get_backend_name() != 'sqlite':
+            return {'skipped': 'not sqlite'}
+        # VACUUM cannot run inside a transaction
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            page_count = connection.exec_driver_sql('PRAGMA page_count').scalar() or 0
+            free_pages = connection.exec_driver_sql('PRAGMA freelist_count').scalar() or 0
+            free_ratio = free_pages / page_count if page_count else 0.0
+            vacuumed = free_ratio >= self.vacuum_min_free_ratio
+            started = time.perf_counter()
+            if vacuumed:
+                connection.exec_driver_sql('VACUUM')
+            connection.exec_driver_sql('ANALYZE')
+            # Merge the full-text index's incremental segments
+            if connection.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'excuse_fts'").first():
+                connection.exec_driver_sql("INSERT INTO excuse_fts (excuse_fts) VALUES ('optimize')")
+            if app.config['SQLITE_WAL']:
+                connection.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+        return {
+            'pages': page_count,
+            'free_ratio': round(free_ratio, 3),
+            'vacuumed': vacuumed,
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+    
+    def snapshot(self):
+        leases = db.session.execute(db.select(MaintenanceLease)).scalars().all()
+        return {
+            'running': self._scheduler is not None and self._pid == os.getpid(),
+            'jobs': {
+                lease.name: {
+                    'holder': lease.holder,
+                    'lease_expires_at': lease.expires_at.isoformat(),
+                    'last_run_at': lease.last_run_at.isoformat() if lease.last_run_at else None,
+                    'last_result': json.loads(lease.last_result) if lease.last_result else None
+                }
+                for lease in leases
             }
+        }
+
+def artifact_rules():
+    audio_dir = os.path.join(app.static_folder, 'audio')
+    rules = [
+        (audio_dir, app.config['AUDIO_RETENTION_DAYS'], app.config['AUDIO_MAX_MB']),
+        (os.path.join(app.static_folder, 'proofs'), app.config['PROOF_RETENTION_DAYS'], app.config['PROOF_MAX_MB']),
+    ]
+    tts_dir = os.path.abspath(app.config['TTS_CACHE_DIR'])
+    if os.path.commonpath([tts_dir, os.path.abspath(audio_dir)]) != os.path.abspath(audio_dir):
+        rules.append((tts_dir, app.config['AUDIO_RETENTION_DAYS'], app.config['AUDIO_MAX_MB']))
+    return rules
+
+maintenance = MaintenanceScheduler(
+    app,
+    interval_minutes=app.config['MAINTENANCE_INTERVAL_MINUTES'],
+    artifact_rules=artifact_rules(),
+    db_hour=app.config['DB_MAINTENANCE_HOUR'],
+    vacuum_min_free_ratio=app.config['DB_VACUUM_MIN_FREE_RATIO']
+)
+
+if excuse_generator.pool:
+    maintenance.add_job('pool_refill', lambda: excuse_generator.pool.refill(
+        excuse_generator, renew=lambda seconds: maintenance.acquire('pool_refill', seconds)
+    ), app.config['POOL_REFILL_SECONDS'])
+    # Every worker reports its own demand, including the ones not refilling
+    maintenance.add_job('pool_demand', excuse_generator.pool.flush_demand, app.config['POOL_REFILL_SECONDS'], exclusive=False)
+
+def start_maintenance():
+    if app.config['MAINTENANCE_ENABLED']:
+        maintenance.start()
+
+@app.cli.command('run-maintenance')
+@click.argument('job', type=click.Choice(['artifacts', 'database', 'all']), default='all')
+def run_maintenance_command(job):
+    """Run maintenance jobs now, unless another process holds their lease"""
+    jobs = {'artifacts': (maintenance.prune_artifacts, maintenance.interval * 0.8), 'database': (maintenance.optimize_database, 3600)}
+    for name, (function, ttl) in jobs.items():
+        if job not in (name, 'all'):
+            continue
+        result = maintenance.run_exclusive(name, function, ttl)
+        if result is None:
+            print(f"⏭️ {name}: another process holds the lease")
+        else:
+            print(f"🧹 {name}: {json.dumps(result)}")
+
+# Rate limiting and admission control
+class RateLimiter:
+    """Token buckets per client and for the whole service, in a shared SQLite file.
+
+    Each bucket refills continuously at `per_minute` tokens a minute up to
+    `burst`. A request takes `cost` tokens from each of the client's buckets
+    and from the global one in a single transaction, or from none of them. A request
+    costing more than `burst` (a large bulk call) needs a full bucket and
+    leaves it in debt. Every gunicorn worker updates the same rows, so
+    limits hold across the pool. If the file cannot be written the request
+    is let through.
+    """
+    
+    def __init__(self, path, user_limit=(30.0, 10.0), global_limit=(600.0, 100.0)):
+        self.path = path
+        self.limits = {'user': user_limit, 'global': global_limit}
+        self._local = threading.local()
+        self._takes = 0
+    
+    def _connect(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Losing the last few refills in a crash is harmless
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_bucket (
+                    bucket TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    allowed INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def take(self, scope, clients, cost=1):
+        """Seconds to wait before retrying, or 0 if the request may proceed.
+
+        Each key in `clients` (e.g. 'ip:10.0.0.7', 'id:42') is a bucket under
+        the per-client limit.
+        """
+        buckets = [(f'{scope}:user:{client}', self.limits['user']) for client in clients]
+        buckets.append((f'{scope}:global', self.limits['global']))
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for bucket, (per_minute, burst) in buckets:
+                    rate = per_minute / 60
+                    need = min(cost, burst)
+                    # Refill for the time since the last request, then spend if there is enough
+                    tokens, allowed = conn.execute(
+                        'INSERT INTO rate_bucket (bucket, tokens, allowed, updated_at) '
+                        'VALUES (:bucket, :burst - :cost, 1, :now) '
+                        'ON CONFLICT (bucket) DO UPDATE SET '
+                        'allowed = min(:burst, tokens + (:now - updated_at) * :rate) >= :need, '
+                        'tokens = min(:burst, tokens + (:now - updated_at) * :rate) '
+                        '- CASE WHEN min(:burst, tokens + (:now - updated_at) * :rate) >= :need THEN :cost ELSE 0 END, '
+                        'updated_at = :now '
+                        'RETURNING tokens, allowed',
+                        {'bucket': bucket, 'burst': burst, 'cost': cost, 'need': need, 'now': now, 'rate': rate}
+                    ).fetchone()
+                    if not allowed:
+                        conn.execute('ROLLBACK')
+                        metrics.inc('rate_limited_total', scope=scope, limit=bucket.split(':')[1])
+                        return max((need - tokens) / rate, 1.0) if rate else 60.0
+                conn.execute('COMMIT')
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+            self._takes += 1
+            if self._takes % 1000 == 0:
+                # A bucket idle for a day has refilled; dropping it changes nothing
+                conn.execute('DELETE FROM rate_bucket WHERE updated_at < ?', (now - 86400,))
+        except sqlite3.Error as e:
+            print(f"⚠️ Rate limiter unavailable, allowing request: {e}")
+        return 0
+    
+    def snapshot(self):
+        return {
+            scope: {'per_minute': per_minute, 'burst': burst}
+            for scope, (per_minute, burst) in self.limits.items()
+        }
+
+rate_limiter = RateLimiter(
+    app.config['RATE_LIMIT_PATH'],
+    user_limit=(app.config['RATE_LIMIT_USER_PER_MINUTE'], app.config['RATE_LIMIT_USER_BURST']),
+    global_limit=(app.config['RATE_LIMIT_GLOBAL_PER_MINUTE'], app.config['RATE_LIMIT_GLOBAL_BURST'])
+) if app.config['RATE_LIMIT_ENABLED'] else None
+
+# Synthesis jobs in flight in this worker, including queued ones
+voice_slots = threading.BoundedSemaphore(app.config['TTS_MAX_IN_FLIGHT'])
+
+def too_many_requests(error, retry_after):
+    response = jsonify({'success': False, 'error': error, 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def rate_limit(scope, data, cost=1):
+    """A 429 response if the caller is over its limit, else None.
+
+    Every request is charged to the caller's address. The user_id in the
+    body is chosen by the client, so it only adds a second bucket and
+    cannot be rotated to get around the address limit.
+    """
+    if not rate_limiter:
+        return None
+    clients = [f'ip:{request.remote_addr}']
+    user_id = data.get('user_id') if isinstance(data, dict) else None
+    if user_id is not None:
+        clients.append(f'id:{user_id}')
+    retry_after = rate_limiter.take(scope, clients, cost)
+    if not retry_after:
+        return None
+    return too_many_requests('Rate limit exceeded, please slow down', int(retry_after + 0.999))
 
-excuse_generator = ExcuseGenerator()
+# Bounded pool shared by all bulk generation requests in this process
+bulk_executor = ThreadPoolExecutor(max_workers=app.config['BULK_MAX_WORKERS'], thread_name_prefix='bulk')
+
+# CPU-heavy proof rendering stays on a few threads however many requests are waiting for it
+proof_executor = ThreadPoolExecutor(max_workers=app.config['PROOF_MAX_WORKERS'], thread_name_prefix='proof')
 
 # Routes
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def ensure_user(user_id):
+    # Create default user if doesn't exist
+    user = db.session.get(User, user_id)
+    if not user:
+        user = User(id=1, username='demo_user', email='demo@example.com')
+        db.session.add(user)
+        db.session.commit()
+        print("👤 Created demo user")
+
+def save_excuse(fields):
+    """Persist a new Excuse, through the write-behind queue when enabled, and return its id"""
+    with metrics.timer(stage='db_write'):
+        if excuse_writer:
+            return excuse_writer.submit(**fields)
+        excuse = Excuse(**fields)
+        db.session.add(excuse)
+        db.session.commit()
+        return excuse.id
+
 @app.route('/api/generate-excuse', methods=['POST'])
 def generate_excuse():
     data = request.get_json()
+    limited = rate_limit('generate', data)
+    if limited:
+        return limited
     
     category = data.get('category', 'work')
     scenario = data.get('scenario', 'general')
@@ -231,20 +3334,13 @@ def generate_excuse():
     language = data.get('language', 'en')
     user_id = data.get('user_id', 1)
     
-    print(f"🎯 Generating excuse: {category}/{urgency} - {scenario} ({language})")
-    
     excuse_data = excuse_generator.generate_excuse(category, scenario, urgency, language)
+    metrics.inc('excuses_served_total', source=excuse_data['source'], endpoint=request.endpoint)
     
-    # Create default user if doesn't exist
-    user = User.query.get(user_id)
-    if not user:
-        user = User(id=1, username='demo_user', email='demo@example.com')
-        db.session.add(user)
-        db.session.commit()
-        print("👤 Created demo user")
+    ensure_user(user_id)
     
     # Save excuse
-    excuse = Excuse(
+    excuse_id = save_excuse(dict(
         user_id=user_id,
         category=category,
         scenario=scenario,
@@ -252,35 +3348,250 @@ def generate_excuse():
         believability_score=excuse_data['believability_score'],
         urgency_level=urgency,
         language=language
-    )
-    
-    db.session.add(excuse)
-    db.session.commit()
-    
-    print(f"💾 Saved excuse #{excuse.id} with score {excuse_data['believability_score']:.1f}")
+    ))
     
     return jsonify({
         'success': True,
-        'excuse_id': excuse.id,
+        'excuse_id': excuse_id,
         'excuse': excuse_data['excuse'],
         'believability_score': excuse_data['believability_score'],
         'category': category,
-        'urgency': urgency
+        'urgency': urgency,
+        'source': excuse_data['source']
+    })
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/generate-excuse/stream', methods=['POST'])
+def generate_excuse_stream():
+    """Same as /api/generate-excuse, but streams the excuse as Server-Sent Events.
+
+    Emits `token` events with {"text": ...} as the model produces them, then a
+    `done` event carrying the saved excuse. A `reset` event means the tokens
+    so far should be discarded.
+    """
+    data = request.get_json()
+    limited = rate_limit('generate', data)
+    if limited:
+        return limited
+    
+    category = data.get('category', 'work')
+    scenario = data.get('scenario', 'general')
+    urgency = data.get('urgency', 'medium')
+    language = data.get('language', 'en')
+    user_id = data.get('user_id', 1)
+    
+    ensure_user(user_id)
+    
+    def events():
+        # Flush headers straight away so the browser can start rendering
+        yield ': stream opened\n\n'
+        for kind, payload in excuse_generator.stream_excuse(category, scenario, urgency, language):
+            if kind == 'token':
+                yield sse_event('token', {'text': payload})
+            elif kind == 'reset':
+                yield sse_event('reset', {})
+            else:
+                metrics.inc('excuses_served_total', source=payload['source'], endpoint=request.endpoint)
+                excuse_id = save_excuse(dict(
+                    user_id=user_id,
+                    category=category,
+                    scenario=scenario,
+                    excuse_text=payload['excuse'],
+                    believability_score=payload['believability_score'],
+                    urgency_level=urgency,
+                    language=language
+                ))
+                yield sse_event('done', {
+                    'success': True,
+                    'excuse_id': excuse_id,
+                    'excuse': payload['excuse'],
+                    'believability_score': payload['believability_score'],
+                    'category': category,
+                    'urgency': urgency,
+                    'source': payload['source']
+                })
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Stop nginx from buffering the stream
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/generate-excuses', methods=['POST'])
+def generate_excuses():
+    data = request.get_json(silent=True)
+    specs = data.get('excuses') if isinstance(data, dict) else data
+    default_user_id = data.get('user_id', 1) if isinstance(data, dict) else 1
+    
+    if not isinstance(specs, list) or not specs:
+        return jsonify({'success': False, 'error': 'Expected a non-empty list of excuse specs'})
+    if len(specs) > app.config['BULK_MAX_ITEMS']:
+        return jsonify({'success': False, 'error': f"At most {app.config['BULK_MAX_ITEMS']} excuses per request"})
+    limited = rate_limit('generate', data if isinstance(data, dict) else None, cost=len(specs))
+    if limited:
+        return limited
+    
+    results = [None] * len(specs)
+    jobs = {}
+    for index, spec in enumerate(specs):
+        if not isinstance(spec, dict):
+            results[index] = {'index': index, 'success': False, 'error': 'Spec must be an object'}
+            continue
+        params = (
+            spec.get('category', 'work'),
+            spec.get('scenario', 'general'),
+            spec.get('urgency', 'medium'),
+            spec.get('language', 'en')
+        )
+        jobs[index] = (spec.get('user_id', default_user_id), params,
+                       bulk_executor.submit(excuse_generator.generate_excuse, *params))
+    
+    # One lookup for every user referenced by the batch
+    user_ids = {user_id for user_id, _, _ in jobs.values()}
+    known_users = {user.id for user in User.query.filter(User.id.in_(user_ids)).all()} if user_ids else set()
+    if 1 in user_ids and 1 not in known_users:
+        db.session.add(User(id=1, username='demo_user', email='demo@example.com'))
+        known_users.add(1)
+        print("👤 Created demo user")
+    
+    pending = []
+    for index, (user_id, (category, scenario, urgency, language), future) in jobs.items():
+        try:
+            excuse_data = future.result()
+        except Exception as e:
+            results[index] = {'index': index, 'success': False, 'error': f'Generation failed: {e}'}
+            continue
+        if user_id not in known_users:
+            results[index] = {'index': index, 'success': False, 'error': 'User not found'}
+            continue
+        metrics.inc('excuses_served_total', source=excuse_data['source'], endpoint=request.endpoint)
+        
+        fields = dict(
+            user_id=user_id,
+            category=category,
+            scenario=scenario,
+            excuse_text=excuse_data['excuse'],
+            believability_score=excuse_data['believability_score'],
+            urgency_level=urgency,
+            language=language
+        )
+        pending.append((index, fields, excuse_data))
+    
+    with metrics.timer(stage='db_write'):
+        if excuse_writer:
+            excuse_ids = excuse_writer.submit_many([fields for _, fields, _ in pending])
+        else:
+            # All rows go out as one executemany INSERT and one commit. Bulk
+            # inserts skip the before_flush hook, so the rollups are updated here
+            excuse_ids = reserve_excuse_ids(len(pending)) if pending else []
+            rows = [dict(fields, id=excuse_id) for excuse_id, (_, fields, _) in zip(excuse_ids, pending)]
+            if rows:
+                db.session.execute(insert(Excuse), rows)
+                deltas = {}
+                for row in rows:
+                    add_stats_delta(deltas, dict(row, is_favorite=False, times_used=0), 1)
+                apply_stats_deltas(db.session.connection(), deltas)
+        db.session.commit()
+    
+    for excuse_id, (index, fields, excuse_data) in zip(excuse_ids, pending):
+        results[index] = {
+            'index': index,
+            'success': True,
+            'excuse_id': excuse_id,
+            'excuse': excuse_data['excuse'],
+            'believability_score': excuse_data['believability_score'],
+            'category': excuse_data['category'],
+            'urgency': excuse_data['urgency'],
+            'source': excuse_data['source']
+        }
+    
+    return jsonify({
+        'success': True,
+        'saved': len(pending),
+        'failed': len(specs) - len(pending),
+        'results': results
+    })
+
+@app.route('/api/status')
+def service_status():
+    return jsonify({
+        'success': True,
+        'llm': {
+            'configured': bool(app.config['OPENAI_API_KEY']),
+            'timeout_seconds': excuse_generator.timeout,
+            'max_in_flight': app.config['LLM_MAX_IN_FLIGHT'],
+            'circuit_breaker': excuse_generator.breaker.snapshot()
+        },
+        'cache': excuse_generator.cache.snapshot() if excuse_generator.cache else None,
+        'pool': excuse_generator.pool.snapshot() if excuse_generator.pool else None,
+        'coalescing': excuse_generator.coalescer.snapshot() if excuse_generator.coalescer else None,
+        'write_behind': excuse_writer.snapshot() if excuse_writer else None,
+        'corpus': excuse_generator.corpus.snapshot(),
+        'scoring': excuse_generator.scorer.snapshot(),
+        'voice': voice_synthesizer.snapshot(),
+        'async': async_runtime.snapshot() if async_runtime else None,
+        'usage': usage_recorder.snapshot(),
+        'profiling': profiler.snapshot(),
+        'rate_limits': rate_limiter.snapshot() if rate_limiter else None,
+        'maintenance': maintenance.snapshot(),
+        'features': features.snapshot()
     })
 
+def admin_authorized():
+    return profiler.verify(request.headers.get('X-Admin-Token'), 'admin')
+
+@app.route('/api/admin/profiles')
+def list_profiles():
+    if not admin_authorized():
+        return jsonify({'success': False, 'error': 'A valid X-Admin-Token header is required'}), 403
+    limit = min(max(request.args.get('limit', 5, type=int), 1), 50)
+    routes = profiler.slowest(limit, route=request.args.get('route'))
+    for entries in routes.values():
+        for summary in entries:
+            summary['download_url'] = f"/api/admin/profiles/{summary['name']}"
+    return jsonify({'success': True, 'routes': routes})
+
+@app.route('/api/admin/profiles/<name>')
+def download_profile(name):
+    if not admin_authorized():
+        return jsonify({'success': False, 'error': 'A valid X-Admin-Token header is required'}), 403
+    path = profiler.profile_path(name)
+    if not path:
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+    return send_file(os.path.abspath(path), as_attachment=True)
+
+@app.cli.command('profile-token')
+@click.argument('path', default='')
+@click.option('--admin', is_flag=True, help='Sign an X-Admin-Token for the /api/admin endpoints instead')
+@click.option('--minutes', default=60, show_default=True, help='How long the token stays valid')
+def profile_token_command(path, admin, minutes):
+    """Print a signed X-Profile-Token that profiles requests to PATH"""
+    if not profiler.secret:
+        print("⚠️ Set PROFILING_SECRET to sign profiling tokens")
+        return
+    if not admin and not path:
+        print("⚠️ Give the request path to profile, e.g. /api/generate-excuse, or pass --admin")
+        return
+    print(profiler.sign('admin' if admin else 'profile', '' if admin else path, ttl=minutes * 60))
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/generate-proof', methods=['POST'])
 def generate_proof():
     data = request.get_json()
     excuse_id = data.get('excuse_id')
     proof_type = data.get('proof_type', 'email')
     
-    excuse = Excuse.query.get(excuse_id)
+    excuse = get_excuse(excuse_id)
     if not excuse:
         return jsonify({'success': False, 'error': 'Excuse not found'})
     
-    print(f"📄 Generating {proof_type} proof for excuse #{excuse_id}")
-    
-    proof_path = generate_proof_document(excuse, proof_type)
+    with metrics.timer(stage='proof', proof_type=proof_type):
+        proof_path = proof_executor.submit(generate_proof_document, excuse, proof_type).result()
     
     if proof_path:
         proof_doc = ProofDocument(
@@ -293,8 +3604,6 @@ def generate_proof():
         excuse.proof_generated = True
         db.session.commit()
         
-        print(f"✅ Proof document created: {proof_path}")
-        
         return jsonify({
             'success': True,
             'proof_path': proof_path,
@@ -307,77 +3616,488 @@ def generate_proof():
 def voice_excuse():
     data = request.get_json()
     excuse_id = data.get('excuse_id')
+    speed = 'slow' if data.get('speed') == 'slow' else 'normal'
+    run_async = bool(data.get('async', False))
     
-    excuse = Excuse.query.get(excuse_id)
+    excuse = get_excuse(excuse_id)
     if not excuse:
         return jsonify({'success': False, 'error': 'Excuse not found'})
     
-    if not tts_available:
+    if not voice_synthesizer.backend.available:
         return jsonify({
             'success': False, 
-            'error': 'Voice features not available. Install with: pip install gTTS pygame'
+            'error': 'Voice features not available. Install with: pip install gTTS'
         })
     
-    try:
-        print(f"🎤 Converting excuse #{excuse_id} to speech...")
-        
-        # Create audio filename
-        audio_filename = f"excuse_{excuse_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3"
-        audio_path = f"static/audio/{audio_filename}"
-        
-        # Create directory if it doesn't exist
-        os.makedirs("static/audio", exist_ok=True)
-        
-        # Select language for TTS
-        tts_language = excuse.language if excuse.language in ['en', 'hi', 'es', 'fr', 'de'] else 'en'
-        
-        # Generate speech using Google TTS
-        tts = gTTS(text=excuse.excuse_text, lang=tts_language, slow=False)
-        tts.save(audio_path)
-        
-        print(f"✅ Voice file generated: {audio_path} (Language: {tts_language})")
-        
+    # Select language for TTS
+    tts_language = excuse.language if excuse.language in ['en', 'hi', 'es', 'fr', 'de'] else 'en'
+    
+    key = voice_synthesizer.audio_key(excuse.excuse_text, tts_language, speed)
+    if voice_synthesizer.lookup(key):
+        metrics.inc('tts_requests_total', result='hit')
         return jsonify({
             'success': True,
-            'audio_url': f'/{audio_path}',
+            'audio_url': voice_synthesizer.audio_url(key),
+            'cached': True,
             'message': f'Voice file generated successfully in {tts_language}!'
         })
     
+    metrics.inc('tts_requests_total', result='miss')
+    # Only new synthesis counts against the limits; cached audio is cheap
+    limited = rate_limit('voice', data)
+    if limited:
+        return limited
+    if not voice_slots.acquire(blocking=False):
+        return too_many_requests('Voice generation is busy, please retry shortly', 1)
+    key, future = voice_synthesizer.submit(excuse.excuse_text, tts_language, speed)
+    future.add_done_callback(lambda _: voice_slots.release())
+    
+    if run_async:
+        return jsonify({
+            'success': True,
+            'job_id': key,
+            'status': 'pending',
+            'status_url': f'/api/voice-jobs/{key}',
+            'audio_url': f'/api/voice-jobs/{key}/audio'
+        }), 202
+    
+    try:
+        future.result(timeout=app.config['TTS_TIMEOUT_SECONDS'])
+    except FutureTimeoutError:
+        # Synthesis keeps running; the client can poll for it
+        return jsonify({
+            'success': False,
+            'error': 'Voice generation is taking longer than expected',
+            'job_id': key,
+            'status_url': f'/api/voice-jobs/{key}'
+        })
     except Exception as e:
         print(f"❌ TTS Error: {str(e)}")
         return jsonify({'success': False, 'error': f'Voice generation failed: {str(e)}'})
+    
+    return jsonify({
+        'success': True,
+        'audio_url': voice_synthesizer.audio_url(key),
+        'cached': False,
+        'message': f'Voice file generated successfully in {tts_language}!'
+    })
+
+def valid_job_id(job_id):
+    return re.fullmatch(r'[0-9a-f]{64}', job_id) is not None
+
+@app.route('/api/voice-jobs/<job_id>')
+def voice_job_status(job_id):
+    if not valid_job_id(job_id):
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    status, error = voice_synthesizer.status(job_id)
+    if status == 'unknown':
+        return jsonify({'success': False, 'job_id': job_id, 'status': status, 'error': 'Job not found'}), 404
+    
+    result = {'success': status != 'failed', 'job_id': job_id, 'status': status}
+    if status == 'ready':
+        result['audio_url'] = voice_synthesizer.audio_url(job_id)
+    if error:
+        result['error'] = f'Voice generation failed: {error}'
+    return jsonify(result)
+
+@app.route('/api/voice-jobs/<job_id>/audio')
+def voice_job_audio(job_id):
+    """Stream the audio, waiting for a job that is still running in any worker"""
+    if not valid_job_id(job_id):
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    try:
+        path = voice_synthesizer.wait(job_id, timeout=app.config['TTS_TIMEOUT_SECONDS'])
+    except FutureTimeoutError:
+        return jsonify({'success': False, 'status': 'pending', 'error': 'Voice generation still running'}), 202
+    except Exception as e:
+        return jsonify({'success': False, 'status': 'failed', 'error': f'Voice generation failed: {str(e)}'}), 500
+    
+    if not path:
+        status, _ = voice_synthesizer.status(job_id)
+        return jsonify({'success': False, 'status': status, 'error': 'Audio not available'}), 404
+    return send_file(path, mimetype='audio/mpeg', conditional=True, max_age=86400)
+
+def usage_response(excuse_id, values):
+    return jsonify({
+        'success': True,
+        'excuse_id': excuse_id,
+        'times_used': values['times_used'] or 0,
+        'last_used': values['last_used'].isoformat() if values['last_used'] else None,
+        'effectiveness_rating': round(values['effectiveness_rating'] or 0.0, 2),
+        'rating_count': values['rating_count'] or 0,
+        'is_favorite': bool(values['is_favorite'])
+    })
+
+@app.route('/api/mark-used', methods=['POST'])
+def mark_used():
+    data = request.get_json()
+    excuse = get_excuse(data.get('excuse_id'))
+    if not excuse:
+        return jsonify({'success': False, 'error': 'Excuse not found'})
+    
+    return usage_response(excuse.id, usage_recorder.record(excuse, uses=1))
+
+@app.route('/api/rate-excuse', methods=['POST'])
+def rate_excuse():
+    data = request.get_json()
+    excuse = get_excuse(data.get('excuse_id'))
+    if not excuse:
+        return jsonify({'success': False, 'error': 'Excuse not found'})
+    try:
+        rating = float(data.get('rating'))
+    except (TypeError, ValueError):
+        rating = None
+    if rating is None or not 1 <= rating <= 5:
+        return jsonify({'success': False, 'error': 'Rating must be a number from 1 to 5'})
+    
+    return usage_response(excuse.id, usage_recorder.record(excuse, rating=rating))
+
+@app.route('/api/favorite-excuse', methods=['POST'])
+def favorite_excuse():
+    # Sets the flag to `favorite` when given, otherwise flips it
+    data = request.get_json()
+    excuse = get_excuse(data.get('excuse_id'))
+    if not excuse:
+        return jsonify({'success': False, 'error': 'Excuse not found'})
+    favorite = data.get('favorite')
+    if favorite is not None and not isinstance(favorite, bool):
+        return jsonify({'success': False, 'error': 'favorite must be true or false'})
+    
+    return usage_response(excuse.id, usage_recorder.record(excuse, favorite='toggle' if favorite is None else favorite))
+
+def encode_history_cursor(created_at, excuse_id):
+    raw = f"{created_at.isoformat()}|{excuse_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_history_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    created_at, excuse_id = raw.rsplit('|', 1)
+    return datetime.fromisoformat(created_at), int(excuse_id)
 
 @app.route('/api/excuse-history')
 def excuse_history():
-    user_id = request.args.get('user_id', 1)
+    user_id = request.args.get('user_id', 1, type=int)
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), 100)
+    cursor = request.args.get('cursor')
+    include_total = request.args.get('include_total', 'true').lower() not in ('0', 'false', 'no')
     
-    excuses = Excuse.query.filter_by(user_id=user_id).order_by(Excuse.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # Only the columns the response needs, no ORM entities
+    query = db.session.query(
+        Excuse.id,
+        Excuse.category,
+        Excuse.scenario,
+        Excuse.excuse_text,
+        Excuse.believability_score,
+        Excuse.times_used,
+        Excuse.is_favorite,
+        Excuse.created_at
+    ).filter(Excuse.user_id == user_id).order_by(Excuse.created_at.desc(), Excuse.id.desc())
+    
+    if cursor:
+        # Keyset pagination: seek past the last row of the previous page
+        try:
+            after_created_at, after_id = decode_history_cursor(cursor)
+        except (ValueError, UnicodeDecodeError):
+            return jsonify({'success': False, 'error': 'Invalid cursor'})
+        query = query.filter(db.tuple_(Excuse.created_at, Excuse.id) < (after_created_at, after_id))
+    elif page > 1:
+        query = query.offset((page - 1) * per_page)
+    
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
     
     excuse_list = []
-    for excuse in excuses.items:
-        excuse_list.append({
-            'id': excuse.id,
-            'category': excuse.category,
-            'scenario': excuse.scenario,
-            'excuse_text': excuse.excuse_text,
-            'believability_score': excuse.believability_score,
-            'times_used': excuse.times_used,
-            'is_favorite': excuse.is_favorite,
-            'created_at': excuse.created_at.isoformat()
-        })
+    for row in rows:
+        excuse_list.append(usage_recorder.merge(row.id, {
+            'id': row.id,
+            'category': row.category,
+            'scenario': row.scenario,
+            'excuse_text': row.excuse_text,
+            'believability_score': row.believability_score,
+            'times_used': row.times_used,
+            'is_favorite': row.is_favorite,
+            'created_at': row.created_at.isoformat()
+        }))
     
-    return jsonify({
+    result = {
         'success': True,
         'excuses': excuse_list,
-        'total': excuses.total,
-        'pages': excuses.pages,
-        'current_page': page
+        'has_more': has_more,
+        'next_cursor': encode_history_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    }
+    if not cursor:
+        result['current_page'] = page
+    if include_total:
+        total = db.session.query(db.func.count(Excuse.id)).filter(Excuse.user_id == user_id).scalar()
+        result['total'] = total
+        result['pages'] = (total + per_page - 1) // per_page
+    
+    return jsonify(result)
+
+@app.route('/api/stats')
+def excuse_stats():
+    user_id = request.args.get('user_id', 1, type=int)
+    top = min(max(request.args.get('top', 5, type=int), 1), 20)
+    
+    # The overall row's version changes with every write, so check it before building anything
+    version = db.session.execute(
+        db.select(ExcuseStats.version).where(ExcuseStats.user_id == user_id, ExcuseStats.dimension == 'all')
+    ).scalar() or 0
+    # Changes this worker has not written yet are counted in too
+    pending_favorites, pending_uses = usage_recorder.pending_totals(user_id)
+    etag = f'stats-{user_id}-{version}-{top}'
+    if pending_favorites or pending_uses:
+        # Other workers hold other pending changes, so tag the values themselves
+        pending = json.dumps([pending_favorites, sorted(pending_uses.items())])
+        etag += '-p' + hashlib.sha256(pending.encode()).hexdigest()[:16]
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    rows = db.session.execute(db.select(ExcuseStats).where(ExcuseStats.user_id == user_id)).scalars().all()
+    overall = next((row for row in rows if row.dimension == 'all'), None)
+    breakdown = {dimension: {} for dimension, _ in STATS_DIMENSIONS}
+    for row in rows:
+        if row.dimension in breakdown and row.excuse_count:
+            breakdown[row.dimension][row.value] = row.excuse_count
+    
+    most_used = db.session.query(
+        Excuse.id, Excuse.category, Excuse.excuse_text, Excuse.times_used
+    ).filter(Excuse.user_id == user_id, Excuse.times_used > 0).order_by(Excuse.times_used.desc()).limit(top).all()
+    if pending_uses:
+        most_used += db.session.query(
+            Excuse.id, Excuse.category, Excuse.excuse_text, Excuse.times_used
+        ).filter(Excuse.id.in_(set(pending_uses) - {row.id for row in most_used})).all()
+    most_used = sorted(
+        (usage_recorder.merge(row.id, dict(row._mapping)) for row in most_used),
+        key=lambda row: row['times_used'], reverse=True
+    )[:top]
+    
+    total = overall.excuse_count if overall else 0
+    response = jsonify({
+        'success': True,
+        'user_id': user_id,
+        'total_excuses': total,
+        'average_believability': round(overall.score_sum / total, 2) if total else None,
+        'favorite_count': (overall.favorite_count if overall else 0) + pending_favorites,
+        'total_times_used': (overall.times_used_sum if overall else 0) + sum(pending_uses.values()),
+        'by_category': breakdown['category'],
+        'by_urgency': breakdown['urgency'],
+        'by_language': breakdown['language'],
+        'most_used': [
+            {'id': row['id'], 'category': row['category'], 'excuse_text': row['excuse_text'], 'times_used': row['times_used']}
+            for row in most_used
+        ]
+    })
+    response.set_etag(etag)
+    # Clients may keep the response but must revalidate it on every poll
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+SEARCH_TERM = re.compile(r'\w+', re.UNICODE)
+search_index_available = None
+
+def search_excuses(user_id, query, category=None, urgency=None, language=None,
+                   since=None, until=None, limit=10, offset=0, method='fts'):
+    """Excuses of one user matching every word of `query`, best match first.
+
+    `method='fts'` ranks with bm25 over the FTS5 index, weighting excuse_text
+    above scenario; `method='like'` is the unindexed baseline, newest first.
+    Each word matches as a prefix, so "dent" finds "dentist".
+    """
+    terms = SEARCH_TERM.findall(query.lower())
+    if not terms:
+        return []
+    filters = ['e.user_id = :user_id']
+    params = {'user_id': user_id, 'limit': limit, 'offset': offset}
+    for column, value in (('category', category), ('urgency_level', urgency), ('language', language)):
+        if value:
+            filters.append(f'e.{column} = :{column}')
+            params[column] = value
+    if since:
+        filters.append('e.created_at >= :since')
+        params['since'] = since
+    if until:
+        filters.append('e.created_at < :until')
+        params['until'] = until
+    columns = 'e.id, e.category, e.scenario, e.excuse_text, e.urgency_level, e.language, e.believability_score, e.is_favorite, e.created_at'
+    
+    if method == 'fts':
+        words = ' AND '.join(f'"{term}"*' for term in terms)
+        params['match'] = f'owner:u{int(user_id)} AND {{excuse_text scenario}}: ({words})'
+        sql = (
+            f"SELECT {columns}, bm25(excuse_fts, 1.0, 0.5, 0.0) AS rank FROM excuse_fts "
+            f"JOIN excuse e ON e.id = excuse_fts.rowid "
+            f"WHERE excuse_fts MATCH :match AND {' AND '.join(filters)} "
+            f"ORDER BY rank LIMIT :limit OFFSET :offset"
+        )
+    else:
+        for index, term in enumerate(terms):
+            filters.append(f"(e.excuse_text LIKE :term{index} ESCAPE '\\' OR e.scenario LIKE :term{index} ESCAPE '\\')")
+            # Terms are \w+ words, so '_' is the only wildcard to escape
+            params[f'term{index}'] = '%' + term.replace('_', '\\_') + '%'
+        sql = (
+            f"SELECT {columns}, NULL AS rank FROM excuse e WHERE {' AND '.join(filters)} "
+            f"ORDER BY e.created_at DESC, e.id DESC LIMIT :limit OFFSET :offset"
+        )
+    
+    statement = db.text(sql).bindparams(
+        *(db.bindparam(name, type_=db.DateTime) for name in ('since', 'until') if name in params)
+    ).columns(created_at=db.DateTime)
+    return db.session.execute(statement, params).all()
+
+def parse_search_date(value):
+    return datetime.fromisoformat(value) if value else None
+
+@app.route('/api/excuse-search')
+def excuse_search():
+    global search_index_available
+    query = request.args.get('q', '').strip()
+    user_id = request.args.get('user_id', 1, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), 50)
+    if not query:
+        return jsonify({'success': False, 'error': 'Missing search query'})
+    try:
+        since = parse_search_date(request.args.get('since'))
+        until = parse_search_date(request.args.get('until'))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Dates must be ISO formatted, e.g. 2024-03-01'})
+    
+    if search_index_available is None:
+        search_index_available = bool(db.session.execute(
+            db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'excuse_fts'")
+        ).first()) if db.engine.url.get_backend_name() == 'sqlite' else False
+    
+    with metrics.timer(stage='search'):
+        rows = search_excuses(
+            user_id, query,
+            category=request.args.get('category'),
+            urgency=request.args.get('urgency'),
+            language=request.args.get('language'),
+            since=since, until=until,
+            limit=per_page + 1, offset=(page - 1) * per_page,
+            method='fts' if search_index_available else 'like'
+        )
+    has_more = len(rows) > per_page
+    
+    return jsonify({
+        'success': True,
+        'query': query,
+        'current_page': page,
+        'has_more': has_more,
+        'results': [
+            {
+                'id': row.id,
+                'category': row.category,
+                'scenario': row.scenario,
+                'excuse_text': row.excuse_text,
+                'urgency': row.urgency_level,
+                'language': row.language,
+                'believability_score': row.believability_score,
+                'is_favorite': bool(usage_recorder.merge(row.id, {'is_favorite': row.is_favorite})['is_favorite']),
+                'created_at': row.created_at.isoformat(),
+                'rank': round(row.rank, 4) if row.rank is not None else None
+            }
+            for row in rows[:per_page]
+        ]
     })
 
+EXPORT_COLUMNS = [
+    'id', 'category', 'scenario', 'excuse_text', 'believability_score', 'urgency_level', 'language',
+    'proof_generated', 'times_used', 'effectiveness_rating', 'rating_count', 'is_favorite', 'created_at', 'last_used'
+]
+
+def export_chunks(rows, export_format, chunk_size):
+    """Encode rows as NDJSON or CSV text, one string per `chunk_size` rows"""
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+    else:
+        buffer = None
+    lines = []
+    for count, row in enumerate(rows, 1):
+        record = usage_recorder.merge(row.id, dict(zip(EXPORT_COLUMNS, row)))
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in record.values()]
+        if buffer:
+            writer.writerow(values)
+        else:
+            lines.append(json.dumps(dict(zip(EXPORT_COLUMNS, values))) + '\n')
+        if count % chunk_size == 0:
+            if buffer:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                yield ''.join(lines)
+                lines = []
+    yield buffer.getvalue() if buffer else ''.join(lines)
+
+def gzip_chunks(chunks):
+    """Compress a stream of strings, flushing after each so the client sees progress"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.route('/api/excuse-export')
+def excuse_export():
+    """Stream a user's whole history as NDJSON (default) or CSV, oldest first.
+
+    Rows are read through a server-side cursor in EXPORT_CHUNK_SIZE batches
+    and written out as they arrive, so memory use does not depend on the
+    number of rows. The body is gzipped when the client accepts it.
+    """
+    user_id = request.args.get('user_id', 1, type=int)
+    export_format = request.args.get('format', 'ndjson').lower()
+    category = request.args.get('category')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'success': False, 'error': 'format must be ndjson or csv'})
+    try:
+        since = parse_search_date(request.args.get('since'))
+        until = parse_search_date(request.args.get('until'))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Dates must be ISO formatted, e.g. 2024-03-01'})
+    
+    query = db.select(*(getattr(Excuse, column) for column in EXPORT_COLUMNS)).where(Excuse.user_id == user_id)
+    if category:
+        query = query.where(Excuse.category == category)
+    if since:
+        query = query.where(Excuse.created_at >= since)
+    if until:
+        query = query.where(Excuse.created_at < until)
+    chunk_size = app.config['EXPORT_CHUNK_SIZE']
+    query = query.order_by(Excuse.created_at, Excuse.id).execution_options(yield_per=chunk_size)
+    
+    def generate():
+        result = db.session.execute(query)
+        try:
+            yield from export_chunks(result, export_format, chunk_size)
+        finally:
+            result.close()
+    
+    body = generate()
+    headers = {
+        'Content-Disposition': f'attachment; filename=excuses-user{user_id}.{export_format}',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',
+        'Vary': 'Accept-Encoding'
+    }
+    if 'gzip' in request.accept_encodings:
+        body = gzip_chunks(body)
+        headers['Content-Encoding'] = 'gzip'
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+
 def generate_proof_document(excuse, proof_type):
     """Generate proof documents"""
     try:
@@ -394,12 +4114,13 @@ def generate_proof_document(excuse, proof_type):
 def generate_fake_email(excuse):
     """Generate fake email screenshot"""
     try:
-        img = Image.new('RGB', (800, 600), color='white')
-        draw = ImageDraw.Draw(img)
+        imaging = features.get('imaging')
+        img = imaging.Image.new('RGB', (800, 600), color='white')
+        draw = imaging.ImageDraw.Draw(img)
         
         try:
-            font = ImageFont.load_default()
-            title_font = ImageFont.load_default()
+            font = imaging.ImageFont.load_default()
+            title_font = imaging.ImageFont.load_default()
         except:
             font = None
             title_font = None
@@ -451,8 +4172,9 @@ def generate_fake_receipt(excuse):
         filepath = f"static/proofs/{filename}"
         os.makedirs("static/proofs", exist_ok=True)
         
-        c = canvas.Canvas(filepath, pagesize=letter)
-        width, height = letter
+        pdf = features.get('pdf')
+        c = pdf.canvas.Canvas(filepath, pagesize=pdf.letter)
+        width, height = pdf.letter
         
         # Header
         c.setFont("Helvetica-Bold", 16)
@@ -493,8 +4215,9 @@ def generate_medical_note(excuse):
         filepath = f"static/proofs/{filename}"
         os.makedirs("static/proofs", exist_ok=True)
         
-        c = canvas.Canvas(filepath, pagesize=letter)
-        width, height = letter
+        pdf = features.get('pdf')
+        c = pdf.canvas.Canvas(filepath, pagesize=pdf.letter)
+        width, height = pdf.letter
         
         # Header
         c.setFont("Helvetica-Bold", 16)
@@ -534,21 +4257,24 @@ def generate_medical_note(excuse):
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        migrate_database()
         print("📊 Database tables created successfully!")
     
     print("🎉 Intelligent Excuse Generator is starting...")
     print("📱 Access the app at: http://localhost:5000")
     
-    if tts_available:
+    if voice_synthesizer.backend.available:
         print("🎤 Voice features enabled! (Google TTS)")
     else:
-        print("🔇 Voice features disabled (install gTTS pygame to enable)")
+        print("🔇 Voice features disabled (install gTTS to enable)")
         
-    if openai.api_key:
+    if app.config['OPENAI_API_KEY']:
         print("🤖 OpenAI API configured - AI features enabled!")
     else:
         print("🤖 No OpenAI API key - using fallback excuses")
         
     print("=" * 60)
+    # With the debug reloader, only the child process that serves requests starts the scheduler
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_maintenance()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,147 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Answers POST /v1/chat/completions like the real service (including `n`
+choices, `usage` and `stream=true` Server-Sent Events) after a configurable
+delay, and can inject errors and hangs so benchmarks exercise the timeout,
+circuit breaker and fallback paths without touching the network.
+
+    python benchmarks/fake_openai.py --port 8766 --latency-ms 400 --jitter-ms 150 --error-rate 0.02
+
+Point the app at it with OPENAI_API_BASE=http://127.0.0.1:8766/v1 and any
+non-empty OPENAI_API_KEY.
+"""
+import argparse
+import http.server
+import itertools
+import json
+import random
+import threading
+import time
+
+EXCUSES = [
+    "I'm so sorry, but my car broke down on the way and I'm waiting for roadside assistance.",
+    "I have a doctor's appointment that was moved to this morning and I can't reschedule it.",
+    "A family emergency came up and I need to be with my parents today.",
+    "My internet provider has an outage in my area and I can't connect to anything.",
+    "The building had a water leak overnight and I have to let the plumber in.",
+]
+
+class FakeOpenAIHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    counter = itertools.count(1)
+    counter_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self.send_json(400, {'error': {'message': 'Invalid JSON', 'type': 'invalid_request_error'}})
+
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self.send_json(404, {'error': {'message': f'Unknown path {self.path}', 'type': 'invalid_request_error'}})
+
+        options = self.server.options
+        roll = random.random()
+        if roll < options.hang_rate:
+            # Never answer inside the client's timeout
+            time.sleep(options.hang_seconds)
+            return self.send_json(504, {'error': {'message': 'Upstream timed out', 'type': 'timeout'}})
+        if roll < options.hang_rate + options.error_rate:
+            time.sleep(self.latency() / 4)
+            return self.send_json(500, {'error': {'message': 'Injected server error', 'type': 'server_error'}})
+
+        with self.counter_lock:
+            request_number = next(self.counter)
+        choices = max(1, int(body.get('n') or 1))
+        texts = [random.choice(EXCUSES) for _ in range(choices)]
+        prompt_tokens = sum(len(str(message.get('content', '')).split()) for message in body.get('messages', []))
+
+        if body.get('stream'):
+            return self.send_stream(request_number, texts[0])
+
+        time.sleep(self.latency())
+        completion_tokens = sum(len(text.split()) for text in texts)
+        self.send_json(200, {
+            'id': f'chatcmpl-fake-{request_number}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'gpt-3.5-turbo'),
+            'choices': [
+                {'index': index, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}
+                for index, text in enumerate(texts)
+            ],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        })
+
+    def latency(self):
+        options = self.server.options
+        return max(0.0, random.gauss(options.latency_ms, options.jitter_ms) / 1000) if options.jitter_ms else options.latency_ms / 1000
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_stream(self, request_number, text):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def write_chunk(data):
+            self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+            self.wfile.flush()
+
+        words = text.split(' ')
+        # Spread the configured latency over the tokens, front-loading the first one
+        time.sleep(self.latency() / 2)
+        for index, word in enumerate(words):
+            chunk = {
+                'id': f'chatcmpl-fake-{request_number}',
+                'object': 'chat.completion.chunk',
+                'choices': [{'index': 0, 'delta': {'content': word if index == 0 else ' ' + word}, 'finish_reason': None}],
+            }
+            write_chunk(f'data: {json.dumps(chunk)}\n\n'.encode())
+            time.sleep(self.latency() / 2 / len(words))
+        write_chunk(b'data: [DONE]\n\n')
+        write_chunk(b'')
+
+def make_server(options):
+    server = http.server.ThreadingHTTPServer((options.host, options.port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.options = options
+    return server
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency-ms', type=float, default=400, help='mean response time')
+    parser.add_argument('--jitter-ms', type=float, default=100, help='standard deviation of the response time')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with HTTP 500')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='fraction of requests held for --hang-seconds')
+    parser.add_argument('--hang-seconds', type=float, default=30.0)
+    return parser
+
+def main():
+    options = build_parser().parse_args()
+    server = make_server(options)
+    print(f"🤖 Fake OpenAI listening on http://{options.host}:{server.server_address[1]}/v1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+"""Load benchmark: throughput and latency percentiles per endpoint.
+
+Starts the fake OpenAI server (benchmarks/fake_openai.py) and the app under
+gunicorn against a throwaway SQLite database seeded with users and excuses,
+then drives each endpoint with a fixed number of concurrent keep-alive
+clients. Voice requests use the stub TTS backend so no audio is fetched
+from Google.
+
+    python benchmarks/load.py --duration 20 --concurrency 16 > load.json
+    python benchmarks/load.py --baseline load.json   # exits 1 on a regression
+
+The report is JSON: one entry per endpoint with request and error counts,
+throughput and p50/p90/p99 latency in milliseconds, plus the fallback and
+cache counters scraped from /metrics.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CATEGORIES = ['work', 'school', 'social', 'family']
+URGENCIES = ['low', 'medium', 'high']
+LANGUAGES = ['en', 'en', 'en', 'es', 'fr', 'de']
+SCENARIOS = [
+    'Late for morning meeting', 'Missed the deadline', 'Skipping the party',
+    'Forgot the assignment', 'Cannot make dinner', 'Leaving early today',
+    'Missed the train', 'Not answering calls', 'Late rent payment', 'Missed practice',
+]
+# Seeded excuses are stitched from these so text searches have something to find
+OPENERS = ["I'm so sorry, but", 'Unfortunately', 'I wanted to let you know that', 'Apologies,', 'Heads up:']
+REASONS = [
+    'my dentist appointment was moved to this morning', 'my car broke down on the highway',
+    'a family emergency came up overnight', 'my internet provider has an outage',
+    'the train was cancelled because of a signal failure', 'I came down with a fever',
+    'the plumber can only come today', 'my flight was delayed by three hours',
+    'my kid is sick and home from school', 'the hospital called about my test results',
+    'traffic is backed up for miles after an accident', 'my landlord scheduled an urgent inspection',
+]
+CLOSERS = [
+    'and I will catch up as soon as I can.', 'so I need to reschedule.', 'and I will be late.',
+    'so I cannot make it today.', 'and I will send an update this afternoon.',
+]
+
+def seeded_text(rng):
+    return f'{rng.choice(OPENERS)} {rng.choice(REASONS)} {rng.choice(CLOSERS)}'
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for(port, path, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', path)
+            if connection.getresponse().status < 500:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Nothing answered on port {port} within {timeout}s')
+
+def seed_database(env, path, users, excuses):
+    """Create the schema with migrate-db, then bulk insert rows directly."""
+    subprocess.run(
+        [sys.executable, '-m', 'flask', '--app', 'app', 'migrate-db'],
+        cwd=ROOT, env=env, check=True, capture_output=True
+    )
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.executemany(
+            'INSERT INTO user (id, username, email, created_at) VALUES (?, ?, ?, ?)',
+            [(user_id, f'bench_{user_id}', f'bench_{user_id}@example.com', str(now)) for user_id in range(1, users + 1)]
+        )
+        # A few heavy users and a long tail, like real history
+        weights = [1 / rank for rank in range(1, users + 1)]
+        owners = rng.choices(range(1, users + 1), weights=weights, k=excuses)
+        connection.executemany(
+            'INSERT INTO excuse (user_id, category, scenario, excuse_text, believability_score, urgency_level, '
+            'language, proof_generated, times_used, effectiveness_rating, is_favorite, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, 0, 0, 0.0, ?, ?)',
+            [
+                (
+                    owner, rng.choice(CATEGORIES), rng.choice(SCENARIOS),
+                    seeded_text(rng),
+                    round(rng.uniform(4, 10), 1), rng.choice(URGENCIES), rng.choice(LANGUAGES),
+                    rng.random() < 0.1, str(now - timedelta(minutes=rng.randrange(0, 525600))),
+                )
+                for owner in owners
+            ]
+        )
+    connection.execute('ANALYZE')
+    connection.close()
+
+class Endpoint:
+    """Builds requests for one endpoint; `next_request` returns (method, path, body)."""
+
+    def __init__(self, name, users, voice_ids):
+        self.name = name
+        self.users = users
+        self.voice_ids = voice_ids
+
+    def next_request(self, rng, state):
+        if self.name == 'generate-excuse':
+            return 'POST', '/api/generate-excuse', {
+                'category': rng.choice(CATEGORIES),
+                'scenario': rng.choice(SCENARIOS),
+                'urgency': rng.choice(URGENCIES),
+                'language': rng.choice(LANGUAGES),
+                'user_id': rng.randint(1, self.users),
+            }
+        if self.name == 'excuse-history':
+            cursor = state.pop('cursor', None)
+            if cursor and rng.random() < 0.5:
+                return 'GET', f"/api/excuse-history?user_id={state['user_id']}&per_page=20&cursor={cursor}", None
+            state['user_id'] = min(int(rng.paretovariate(1.2)), self.users)
+            include_total = 'true' if rng.random() < 0.2 else 'false'
+            return 'GET', f"/api/excuse-history?user_id={state['user_id']}&per_page=20&include_total={include_total}", None
+        if self.name == 'voice-excuse':
+            return 'POST', '/api/voice-excuse', {'excuse_id': rng.randint(1, self.voice_ids)}
+        raise ValueError(self.name)
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+def drive(port, endpoint, concurrency, duration, warmup):
+    """Run `concurrency` closed-loop clients; returns latencies (ms) and status counts."""
+    latencies = []
+    statuses = {}
+    errors = []
+    lock = threading.Lock()
+    started = time.monotonic()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        state = {}
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            method, path, body = endpoint.next_request(rng, state)
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            request_started = time.perf_counter()
+            try:
+                connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                status, data = type(e).__name__, b''
+            elapsed = (time.perf_counter() - request_started) * 1000
+            if status == 200 and endpoint.name == 'excuse-history':
+                try:
+                    state['cursor'] = json.loads(data).get('next_cursor')
+                except ValueError:
+                    pass
+            if now < measure_from:
+                continue
+            with lock:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                if status == 200:
+                    latencies.append(elapsed)
+                elif len(errors) < 5:
+                    errors.append(data[:200].decode(errors='replace'))
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, errors
+
+def summarize(latencies, statuses, errors, duration):
+    total = sum(statuses.values())
+    return {
+        'requests': total,
+        'errors': total - statuses.get('200', 0),
+        'status_codes': statuses,
+        'throughput_rps': round(len(latencies) / duration, 2),
+        'latency_ms': {
+            'mean': round(statistics.fmean(latencies), 2) if latencies else None,
+            'p50': round(percentile(latencies, 0.50), 2) if latencies else None,
+            'p90': round(percentile(latencies, 0.90), 2) if latencies else None,
+            'p99': round(percentile(latencies, 0.99), 2) if latencies else None,
+            'max': round(max(latencies), 2) if latencies else None,
+        },
+        'sample_errors': errors,
+    }
+
+def scrape_metrics(port):
+    """Totals of the server-side counters that explain latency (fallbacks, cache hits)."""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    connection.request('GET', '/metrics')
+    text = connection.getresponse().read().decode()
+    totals = {}
+    for line in text.splitlines():
+        if line.startswith(('excuses_served_total', 'llm_fallbacks_total', 'tts_requests_total')):
+            name, value = line.rsplit(' ', 1)
+            totals[name] = totals.get(name, 0) + float(value)
+    return totals
+
+def compare(report, baseline, tolerance):
+    """Endpoints whose p99 grew or throughput fell by more than `tolerance`."""
+    regressions = []
+    for name, current in report['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous or not current['latency_ms']['p99'] or not previous['latency_ms']['p99']:
+            continue
+        if current['latency_ms']['p99'] > previous['latency_ms']['p99'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {previous['latency_ms']['p99']}ms -> {current['latency_ms']['p99']}ms")
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return regressions
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--endpoints', default='generate-excuse,excuse-history,voice-excuse')
+    parser.add_argument('--duration', type=float, default=15, help='measured seconds per endpoint')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds per endpoint before measuring')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='threads per gunicorn worker')
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--excuses', type=int, default=100000, help='rows seeded into the excuse table')
+    parser.add_argument('--voice-ids', type=int, default=200, help='distinct excuses voice requests pick from')
+    parser.add_argument('--llm-latency-ms', type=float, default=400)
+    parser.add_argument('--llm-jitter-ms', type=float, default=100)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--llm-hang-rate', type=float, default=0.0)
+    parser.add_argument('--tts-delay-ms', type=int, default=150, help='simulated synthesis time of the stub TTS backend')
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE', help='extra app setting, repeatable')
+    parser.add_argument('--baseline', help='earlier report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative regression against --baseline')
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    endpoints = [name.strip() for name in args.endpoints.split(',') if name.strip()]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        openai_port, app_port = free_port(), free_port()
+        db_path = os.path.join(tmp, 'bench.db')
+        env = dict(
+            os.environ,
+            DATABASE_URL=f'sqlite:///{db_path}',
+            EXCUSE_CACHE_PATH=os.path.join(tmp, 'cache.db'),
+            CORPUS_PATH=os.path.join(tmp, 'corpus.db'),
+            METRICS_DIR=os.path.join(tmp, 'metrics'),
+            POOL_PATH=os.path.join(tmp, 'pool.db'),
+            PROFILING_DIR=os.path.join(tmp, 'profiles'),
+            # Measure the app, not the limiter; one client would share a single bucket
+            RATE_LIMIT_ENABLED='False',
+            RATE_LIMIT_PATH=os.path.join(tmp, 'rate_limits.db'),
+            MAINTENANCE_ENABLED='False',
+            TTS_BACKEND='stub',
+            TTS_STUB_DELAY_MS=str(args.tts_delay_ms),
+            TTS_CACHE_DIR=os.path.join(tmp, 'audio'),
+            OPENAI_API_KEY='sk-benchmark',
+            OPENAI_API_BASE=f'http://127.0.0.1:{openai_port}/v1',
+            GUNICORN_BIND=f'127.0.0.1:{app_port}',
+            GUNICORN_WORKERS=str(args.workers),
+        )
+        env.update(setting.split('=', 1) for setting in args.env)
+
+        seed_started = time.perf_counter()
+        seed_database(env, db_path, args.users, args.excuses)
+        seed_seconds = time.perf_counter() - seed_started
+
+        processes = []
+        try:
+            processes.append(subprocess.Popen(
+                [sys.executable, os.path.join(HERE, 'fake_openai.py'), '--port', str(openai_port),
+                 '--latency-ms', str(args.llm_latency_ms), '--jitter-ms', str(args.llm_jitter_ms),
+                 '--error-rate', str(args.llm_error_rate), '--hang-rate', str(args.llm_hang_rate)],
+                stdout=subprocess.DEVNULL
+            ))
+            processes.append(subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '--threads', str(args.threads), 'app:app'],
+                cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            ))
+            wait_for(app_port, '/api/status')
+
+            results = {}
+            for name in endpoints:
+                endpoint = Endpoint(name, args.users, min(args.voice_ids, args.excuses))
+                latencies, statuses, errors = drive(app_port, endpoint, args.concurrency, args.duration, args.warmup)
+                results[name] = summarize(latencies, statuses, errors, args.duration)
+            # Workers flush their metrics at most once per METRICS_FLUSH_SECONDS
+            time.sleep(1.5)
+            server = scrape_metrics(app_port)
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait(timeout=30)
+
+    report = {
+        'benchmark': 'load',
+        'config': {
+            key: getattr(args, key) for key in (
+                'duration', 'warmup', 'concurrency', 'workers', 'threads', 'users', 'excuses',
+                'llm_latency_ms', 'llm_jitter_ms', 'llm_error_rate', 'llm_hang_rate', 'tts_delay_ms',
+            )
+        },
+        'seed_seconds': round(seed_seconds, 2),
+        'endpoints': results,
+        'server': server,
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"❌ {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
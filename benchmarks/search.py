@@ -0,0 +1,97 @@
+"""Search benchmark: /api/excuse-search's FTS5 query against a LIKE scan.
+
+Seeds a throwaway database the same way as benchmarks/load.py, then times
+`search_excuses` with both methods for a set of queries, for the heaviest
+user and for a typical one. Reports median/p90/p99 milliseconds per query
+and method as JSON.
+
+    python benchmarks/search.py --excuses 200000 > search.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from load import ROOT, percentile, seed_database
+
+QUERIES = [
+    {'query': 'dentist'},
+    {'query': 'car broke'},
+    {'query': 'hospital results'},
+    {'query': 'emerg'},
+    {'query': 'flight delayed', 'category': 'work'},
+    {'query': 'fever', 'urgency': 'high', 'language': 'en'},
+    # No seeded excuse mentions these, so LIKE has to read the whole history
+    {'query': 'passport renewal'},
+    {'query': 'zoo'},
+]
+
+def time_query(app_module, user_id, spec, method, runs):
+    samples = []
+    matches = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        rows = app_module.search_excuses(user_id, limit=20, method=method, **spec)
+        samples.append((time.perf_counter() - started) * 1000)
+        matches = len(rows)
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'p90_ms': round(percentile(samples, 0.90), 3),
+        'p99_ms': round(percentile(samples, 0.99), 3),
+        'first_page_results': matches,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--excuses', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=30, help='timed runs per query and method')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'search.db')
+        env = dict(
+            os.environ,
+            DATABASE_URL=f'sqlite:///{db_path}',
+            EXCUSE_CACHE_PATH=os.path.join(tmp, 'cache.db'),
+            CORPUS_PATH=os.path.join(tmp, 'corpus.db'),
+            METRICS_DIR=os.path.join(tmp, 'metrics'),
+            POOL_PATH=os.path.join(tmp, 'pool.db'),
+            PROFILING_DIR=os.path.join(tmp, 'profiles'),
+            RATE_LIMIT_PATH=os.path.join(tmp, 'rate_limits.db'),
+            MAINTENANCE_ENABLED='False',
+            OPENAI_API_KEY='',
+        )
+        seed_database(env, db_path, args.users, args.excuses)
+
+        # Import the app against the seeded database
+        os.environ.update(env)
+        sys.path.insert(0, ROOT)
+        import app as app_module
+
+        results = {}
+        with app_module.app.app_context():
+            for label, user_id in (('heaviest_user', 1), ('typical_user', min(50, args.users))):
+                rows = app_module.Excuse.query.filter_by(user_id=user_id).count()
+                per_user = {'excuses': rows, 'queries': []}
+                for spec in QUERIES:
+                    entry = dict(spec)
+                    for method in ('fts', 'like'):
+                        entry[method] = time_query(app_module, user_id, spec, method, args.runs)
+                    entry['speedup'] = round(entry['like']['median_ms'] / max(entry['fts']['median_ms'], 1e-6), 1)
+                    per_user['queries'].append(entry)
+                results[label] = per_user
+            app_module.db.session.remove()
+            app_module.db.engine.dispose()
+
+    print(json.dumps({
+        'benchmark': 'search',
+        'config': {'users': args.users, 'excuses': args.excuses, 'runs': args.runs},
+        'results': results,
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
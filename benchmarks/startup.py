@@ -0,0 +1,81 @@
+"""Startup-time benchmark: import cost and first-request latency of app.py.
+
+Each run starts a fresh interpreter, imports the app and times the first
+requests through Flask's test client against a throwaway SQLite database.
+OpenAI is disabled so the numbers measure the app, not the network.
+
+    python benchmarks/startup.py --runs 5 > startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, time
+started = time.perf_counter()
+import app
+import_ms = (time.perf_counter() - started) * 1000
+
+with app.app.app_context():
+    app.migrate_database()
+client = app.app.test_client()
+
+timings = {'import_ms': import_ms}
+for name, call in [
+    ('first_index_ms', lambda: client.get('/')),
+    ('first_generate_ms', lambda: client.post('/api/generate-excuse', json={'scenario': 'startup probe'})),
+    ('second_generate_ms', lambda: client.post('/api/generate-excuse', json={'scenario': 'startup probe'})),
+    ('first_history_ms', lambda: client.get('/api/excuse-history')),
+]:
+    started = time.perf_counter()
+    response = call()
+    timings[name] = (time.perf_counter() - started) * 1000
+    assert response.status_code == 200, (name, response.status_code)
+
+print(json.dumps(timings))
+'''
+
+def run_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+            EXCUSE_CACHE_PATH=os.path.join(tmp, 'cache.db'),
+            CORPUS_PATH=os.path.join(tmp, 'corpus.db'),
+            METRICS_DIR=os.path.join(tmp, 'metrics'),
+            POOL_PATH=os.path.join(tmp, 'pool.db'),
+            PROFILING_DIR=os.path.join(tmp, 'profiles'),
+            RATE_LIMIT_PATH=os.path.join(tmp, 'rate_limits.db'),
+            OPENAI_API_KEY='',
+            TTS_BACKEND='stub',
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    
+    runs = [run_once() for _ in range(args.runs)]
+    summary = {
+        metric: {
+            'median': round(statistics.median(run[metric] for run in runs), 2),
+            'min': round(min(run[metric] for run in runs), 2),
+            'max': round(max(run[metric] for run in runs), 2),
+        }
+        for metric in runs[0]
+    }
+    print(json.dumps({'benchmark': 'startup', 'runs': args.runs, 'metrics': summary}, indent=2))
+
+if __name__ == '__main__':
+    main()
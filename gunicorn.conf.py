@@ -0,0 +1,41 @@
+# gunicorn.conf.py - Production server settings for the Intelligent Excuse Generator
+# Run with: gunicorn app:app
+import glob
+import os
+
+import decouple
+
+bind = decouple.config('GUNICORN_BIND', default='0.0.0.0:8000')
+workers = decouple.config('GUNICORN_WORKERS', default=4, cast=int)
+timeout = decouple.config('GUNICORN_TIMEOUT', default=60, cast=int)
+
+# With ASYNC_MODE, OpenAI calls run on an event loop in each worker and a
+# request waiting on one only holds an idle thread, so give workers many
+# threads (gunicorn's gthread worker) instead of adding processes
+async_mode = decouple.config('ASYNC_MODE', default=False, cast=bool)
+threads = decouple.config('GUNICORN_THREADS', default=256 if async_mode else 1, cast=int)
+
+# Import the app once in the master and fork workers from it. app.py only
+# loads cheap modules at import; heavy features are loaded lazily or, if
+# listed in PRELOAD_FEATURES, once in the master so workers share them.
+preload_app = decouple.config('GUNICORN_PRELOAD', default=True, cast=bool)
+preload_features = decouple.config('PRELOAD_FEATURES', default='', cast=decouple.Csv())
+
+def on_starting(server):
+    # Start metrics from zero for a new server; workers write snapshots here
+    metrics_dir = decouple.config('METRICS_DIR', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'metrics'))
+    for path in glob.glob(os.path.join(metrics_dir, '*.json')):
+        os.remove(path)
+
+def when_ready(server):
+    if preload_app and preload_features:
+        from app import features
+        features.preload(preload_features)
+
+def post_fork(server, worker):
+    # Never share SQLite connections opened by the master with a worker
+    from app import app, db, start_maintenance
+    with app.app_context():
+        db.engine.dispose(close=False)
+    # Every worker runs the scheduler; the lease table picks who runs each job
+    start_maintenance()
@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP = tempfile.mkdtemp(prefix='liar-tests-')
+
+# Everything the app writes goes to a throwaway directory, and nothing talks to OpenAI
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(TMP, 'excuse_generator.db')}",
+    'OPENAI_API_KEY': '',
+    'METRICS_DIR': os.path.join(TMP, 'metrics'),
+    'EXCUSE_CACHE_PATH': os.path.join(TMP, 'excuse_cache.db'),
+    'CORPUS_PATH': os.path.join(TMP, 'excuse_corpus.db'),
+    'POOL_PATH': os.path.join(TMP, 'excuse_pool.db'),
+    'TTS_CACHE_DIR': os.path.join(TMP, 'audio'),
+    'RATE_LIMIT_ENABLED': 'False',
+    'RATE_LIMIT_PATH': os.path.join(TMP, 'rate_limits.db'),
+    'MAINTENANCE_ENABLED': 'False',
+    'PROFILING_DIR': os.path.join(TMP, 'profiles'),
+    'WRITE_BEHIND_DEAD_LETTER_PATH': os.path.join(TMP, 'write_behind_failed.ndjson'),
+})
+sys.path.insert(0, ROOT)
+
+import app as app_module  # noqa: E402
+
+@pytest.fixture(scope='session')
+def liar():
+    with app_module.app.app_context():
+        app_module.migrate_database()
+    return app_module
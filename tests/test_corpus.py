@@ -0,0 +1,12 @@
+import time
+
+def test_malformed_source_on_first_start_serves_the_built_in_excuses(liar, tmp_path):
+    source = tmp_path / 'excuses.json'
+    source.write_text('{"en": {"work": ', encoding='utf-8')
+    corpus = liar.ExcuseCorpus(str(source), str(tmp_path / 'corpus.db'), reload_interval=0.01)
+    
+    assert corpus.sample('en', 'work', 'medium') == "I'm not feeling well and need to rest today."
+    
+    source.write_text('{"en": {"work": {"medium": ["My bike has a flat tyre."]}}}', encoding='utf-8')
+    time.sleep(0.02)
+    assert corpus.sample('en', 'work', 'medium') == 'My bike has a flat tyre.'
@@ -0,0 +1,18 @@
+def make_generator(liar, monkeypatch, **kwargs):
+    generator = liar.ExcuseGenerator(liar.excuse_generator.corpus, **kwargs)
+    monkeypatch.setitem(liar.app.config, 'OPENAI_API_KEY', 'sk-test')
+    monkeypatch.setattr(generator, 'request_completion', lambda prompt, n=1: ['My train was cancelled.'] * n)
+    return generator
+
+def test_half_open_without_a_slot_then_recovery(liar, monkeypatch):
+    breaker = liar.CircuitBreaker(failure_threshold=1, cooldown=0.0)
+    generator = make_generator(liar, monkeypatch, breaker=breaker, max_in_flight=1)
+    breaker.record_failure()
+    
+    # Cooldown over, but every slot is taken: the trial must not be used up
+    generator.slots.acquire()
+    assert generator.generate_excuse('work', 'general')['source'] == 'fallback'
+    generator.slots.release()
+    
+    assert generator.generate_excuse('work', 'general')['source'] == 'llm'
+    assert breaker.snapshot()['state'] == 'closed'
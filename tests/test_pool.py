@@ -0,0 +1,24 @@
+import time
+
+def seeded_pool(liar, tmp_path):
+    pool = liar.ExcusePool(str(tmp_path / 'pool.db'))
+    pool._connect().execute(
+        "INSERT INTO pool_demand (category, urgency, language, requests, hits, pending, rated_at) "
+        "VALUES ('work', 'medium', 'en', 100, 0, 100, ?)", (time.time() - 60,)
+    )
+    return pool
+
+def test_refill_without_a_slot_keeps_the_half_open_trial(liar, monkeypatch, tmp_path):
+    breaker = liar.CircuitBreaker(failure_threshold=1, cooldown=0.0)
+    generator = liar.ExcuseGenerator(liar.excuse_generator.corpus, breaker=breaker, max_in_flight=1)
+    monkeypatch.setitem(liar.app.config, 'OPENAI_API_KEY', 'sk-test')
+    monkeypatch.setattr(generator, 'request_completion', lambda prompt, n=1: ['My train was cancelled.'] * n)
+    pool = seeded_pool(liar, tmp_path)
+    breaker.record_failure()
+    
+    generator.slots.acquire()
+    assert pool.refill(generator) == {'low_keys': 1, 'generated': 0, 'deferred': True}
+    generator.slots.release()
+    
+    assert pool.refill(generator)['generated'] > 0
+    assert breaker.snapshot()['state'] == 'closed'
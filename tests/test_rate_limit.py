@@ -0,0 +1,25 @@
+def test_rotating_user_id_does_not_get_around_the_address_limit(liar, monkeypatch, tmp_path):
+    limiter = liar.RateLimiter(str(tmp_path / 'rate_limits.db'), user_limit=(0.0, 3.0), global_limit=(0.0, 100.0))
+    monkeypatch.setattr(liar, 'rate_limiter', limiter)
+    
+    statuses = []
+    for user_id in range(5):
+        with liar.app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.7'}):
+            limited = liar.rate_limit('generate', {'user_id': user_id})
+            statuses.append(limited.status_code if limited else 200)
+    assert statuses == [200, 200, 200, 429, 429]
+    
+    # Another address is limited separately
+    with liar.app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.8'}):
+        assert liar.rate_limit('generate', {'user_id': 0}) is None
+
+def test_user_id_adds_a_narrower_bucket(liar, monkeypatch, tmp_path):
+    limiter = liar.RateLimiter(str(tmp_path / 'rate_limits.db'), user_limit=(0.0, 2.0), global_limit=(0.0, 100.0))
+    monkeypatch.setattr(liar, 'rate_limiter', limiter)
+    
+    statuses = []
+    for address in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+        with liar.app.test_request_context(environ_base={'REMOTE_ADDR': address}):
+            limited = liar.rate_limit('generate', {'user_id': 42})
+            statuses.append(limited.status_code if limited else 200)
+    assert statuses == [200, 200, 429]
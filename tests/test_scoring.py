@@ -0,0 +1,16 @@
+import pytest
+
+def substring_scan(scorer, lowered_text):
+    keywords = scorer.specific_words.union(*scorer.urgency_words.values())
+    return frozenset(word for word in keywords if word in lowered_text)
+
+@pytest.mark.parametrize('weights, text', [
+    (None, 'my car broke down on the way to an urgent doctor appointment'),
+    (None, 'there was a family emergency, i think it might be serious'),
+    (None, 'nothing to see here'),
+    ({'specific_words': ['sick', 'sickness']}, 'i have a sickness'),
+    ({'specific_words': ['car', 'cart', 'carton']}, 'the carton fell off the cart'),
+])
+def test_keywords_match_a_substring_scan(liar, weights, text):
+    scorer = liar.BelievabilityScorer(weights)
+    assert scorer.keywords_in(text) == substring_scan(scorer, text)
@@ -0,0 +1,33 @@
+import pytest
+
+class FailingBackend:
+    name = 'failing'
+    available = True
+
+    def synthesize(self, text, language, speed, path):
+        raise RuntimeError('no voice today')
+
+def test_jobs_are_visible_from_another_worker(liar, tmp_path):
+    accepting = liar.VoiceSynthesizer(liar.StubTTSBackend(delay=0.3), str(tmp_path), 10 * 1024 * 1024)
+    polled = liar.VoiceSynthesizer(liar.StubTTSBackend(), str(tmp_path), 10 * 1024 * 1024)
+    
+    key, _ = accepting.submit('My cat ate my homework.', 'en', 'normal')
+    assert polled.status(key) == ('pending', None)
+    assert polled.wait(key, timeout=5) == accepting.audio_path(key)
+    assert polled.status(key) == ('ready', None)
+
+def test_failures_are_visible_from_another_worker(liar, tmp_path):
+    accepting = liar.VoiceSynthesizer(FailingBackend(), str(tmp_path), 10 * 1024 * 1024)
+    polled = liar.VoiceSynthesizer(liar.StubTTSBackend(), str(tmp_path), 10 * 1024 * 1024)
+    
+    key, future = accepting.submit('My cat ate my homework.', 'en', 'normal')
+    with pytest.raises(RuntimeError):
+        future.result(timeout=5)
+    assert polled.status(key) == ('failed', 'no voice today')
+    with pytest.raises(RuntimeError, match='no voice today'):
+        polled.wait(key, timeout=5)
+
+def test_unknown_jobs_do_not_wait(liar, tmp_path):
+    polled = liar.VoiceSynthesizer(liar.StubTTSBackend(), str(tmp_path), 10 * 1024 * 1024)
+    assert polled.status('0' * 64) == ('unknown', None)
+    assert polled.wait('0' * 64, timeout=5) is None
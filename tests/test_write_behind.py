@@ -0,0 +1,22 @@
+import time
+
+def excuse_fields(text):
+    return dict(user_id=1, category='work', scenario='general', excuse_text=text, believability_score=7.0)
+
+def test_read_through_another_writer_waits_for_the_commit(liar, monkeypatch):
+    owner = liar.ExcuseWriter(liar.app, flush_interval=0.3)
+    reader = liar.ExcuseWriter(liar.app, flush_interval=0.3)
+    monkeypatch.setattr(liar, 'excuse_writer', reader)
+    
+    excuse_id = owner.submit(**excuse_fields('The printer caught fire.'))
+    with liar.app.app_context():
+        excuse = liar.get_excuse(excuse_id)
+        assert excuse is not None
+        assert excuse.excuse_text == 'The printer caught fire.'
+
+def test_unissued_ids_are_not_waited_for(liar, monkeypatch):
+    monkeypatch.setattr(liar, 'excuse_writer', liar.ExcuseWriter(liar.app, flush_interval=5.0))
+    with liar.app.app_context():
+        started = time.monotonic()
+        assert liar.get_excuse(10 ** 9) is None
+        assert time.monotonic() - started < 1.0